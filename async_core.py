@@ -0,0 +1,232 @@
+"""
+Asyncio bot core (BOT_MODE=async).
+
+Updates are polled by AsyncTeleBot over one shared aiohttp session. The
+long-running flows that used to get an ad-hoc daemon thread each run natively
+on the event loop with asyncio subprocesses: ⚡ Run, and 📦 Install through
+pip_progress.PipRun.run_async, whose progress edits are tasks on the same
+loop. Every other update is handed to the existing synchronous handlers on
+one bounded executor, so blocking calls (file downloads, the importlib load
+in host_api_callback, ...) never use more than ASYNC_WORKERS threads.
+
+Limitation: only polling, ⚡ Run and 📦 Install use the aiohttp session.
+The bridged handlers still reply through the sync TeleBot, i.e. blocking
+`requests` calls on the executor threads, so their Telegram traffic is
+bounded by ASYNC_WORKERS rather than multiplexed on the loop.
+
+Needs aiohttp (telebot.async_telebot imports it); without it the bot falls
+back to sync polling.
+
+Started from hostingbotrenderv2.py:
+    async_core.run(sys.modules[__name__])
+"""
+import os
+import asyncio
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from telebot import asyncio_helper
+from telebot.async_telebot import AsyncTeleBot
+
+import bytecode_cache
+import diagnostics
+import pip_progress
+import venvs
+
+ASYNC_WORKERS = int(os.environ.get("ASYNC_WORKERS", "8"))
+ASYNC_HTTP_POOL = int(os.environ.get("ASYNC_HTTP_POOL", "100"))
+
+
+class AsyncBotCore:
+    def __init__(self, core):
+        # `core` is the hostingbotrenderv2 module: shared state and sync handlers
+        self.core = core
+        asyncio_helper.REQUEST_LIMIT = ASYNC_HTTP_POOL
+        self.bot = AsyncTeleBot(core.BOT_TOKEN)
+        self.executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="bot-worker")
+        self.pending_installs = set()
+        self.tasks = set()
+
+        # Sync handlers run inline on our executor instead of telebot's own worker pool
+        core.bot.threaded = False
+        self._register()
+
+    async def in_executor(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _register(self):
+        bot = self.bot
+
+        @bot.message_handler(func=lambda message: message.chat.id in self.pending_installs, content_types=['text'])
+        async def install_step(message):
+            self.pending_installs.discard(message.chat.id)
+            await self.install_packages(message)
+
+        @bot.message_handler(func=lambda message: message.text == "📦 Install")
+        async def install_request(message):
+            self.pending_installs.add(message.chat.id)
+            await bot.reply_to(message, "📦 *Enter package name:*\n\nExample: `requests` or `numpy pandas`\nFor a project: `myproject: numpy pandas`", parse_mode='Markdown')
+
+        @bot.callback_query_handler(func=lambda call: call.data.startswith('run_'))
+        async def run_callback(call):
+            await self.run_file_callback(call)
+
+        # Everything else: the synchronous handlers, on the bounded executor
+        @bot.message_handler(func=lambda message: True, content_types=['text', 'document', 'photo', 'audio', 'video', 'voice', 'sticker'])
+        async def bridge_message(message):
+            await self.in_executor(self.core.bot.process_new_messages, [message])
+
+        @bot.callback_query_handler(func=lambda call: True)
+        async def bridge_callback(call):
+            await self.in_executor(self.core.bot.process_new_callback_query, [call])
+
+    # --- ⚡ Run ---
+
+    async def run_file_callback(self, call):
+        core = self.core
+        file_name = call.data[4:]
+        if file_name in core.active_processes:
+            return await self.bot.answer_callback_query(call.id, "⚠️ Already running!")
+
+        file_path, project_dir = core.resolve_upload(file_name)
+        if file_path is None:
+            return await self.bot.answer_callback_query(call.id, "❌ No entry point (main.py/app.py) in project!")
+        if project_dir:
+            file_path = os.path.abspath(file_path)
+
+        quota_error = core.quota_store.acquire_script(call.from_user.id)
+        if quota_error:
+            return await self.bot.answer_callback_query(call.id, f"❌ {quota_error}")
+
+        # Until the task exists (and owns the slot), a failure here must give it back
+        try:
+            await self.bot.answer_callback_query(call.id, "⚡ Starting...")
+            await self.bot.edit_message_text(f"⚡ *Running:* `{file_name}`", call.message.chat.id, call.message.message_id, parse_mode='Markdown')
+            # Keep a strong reference until the run finishes
+            task = asyncio.create_task(self.run_file(file_path, file_name, call.message.chat.id, project_dir, call.from_user.id))
+        except BaseException:
+            core.quota_store.release_script(call.from_user.id, pending=True)
+            raise
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_file(self, file_path, file_name, chat_id, cwd=None, user_id=None):
+        core = self.core
+        started = False
+        try:
+            owner = core.upload_owner(file_name, user_id)
+            if file_path.endswith('.py') and cwd is None:
+                await self.in_executor(core.check_and_install_requirements, file_path, owner)
+
+            await self.bot.send_message(chat_id, f"🚀 *Started Execution:* `{file_name}`\n\n⏳ Processing...", parse_mode='Markdown')
+
+            if core.VENVS_ENABLED:
+                python = await self.in_executor(venvs.ensure_env, core.upload_env(cwd, owner))
+            else:
+                python = 'python'
+            args = [bytecode_cache.RUNNER, file_path] if file_path.endswith('.py') else [file_path]
+            process = await asyncio.create_subprocess_exec(
+                python, *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                limit=1024 * 1024
+            )
+            core.active_processes[file_name] = {'process': process, 'start_time': datetime.now(), 'chat_id': chat_id, 'user_id': user_id}
+            if user_id is not None:
+                core.quota_store.activate_script(user_id)
+            started = True
+
+            output_lines = []
+            error_lines = []
+            line_count = 0
+
+            async def read_stdout():
+                nonlocal line_count
+                async for raw in process.stdout:
+                    output_lines.append(raw.decode(errors='replace'))
+                    del output_lines[:-50]
+                    line_count += 1
+                    if line_count % 10 == 0:
+                        await self.bot.send_message(chat_id, f"⚡ Running {file_name}...\nLines: {line_count}")
+
+            async def read_stderr():
+                async for raw in process.stderr:
+                    error_lines.append(raw.decode(errors='replace'))
+                    del error_lines[:-50]
+
+            # Both pipes drained concurrently: a chatty stderr can't stall the script
+            await asyncio.gather(read_stdout(), read_stderr())
+            await process.wait()
+
+            output = ''.join(output_lines)
+            error = ''.join(error_lines)
+
+            response = f"✅ *Finished:* `{file_name}`\n\n"
+            if output: response += f"📝 *Output:*\n```\n{output[-2000:]}\n```\n\n"
+            if error: response += f"⚠️ *Errors:*\n```\n{error[-1000:]}\n```"
+            if not output and not error: response += "No output."
+
+            await self.bot.send_message(chat_id, response, parse_mode='Markdown')
+        except Exception as e:
+            await self.bot.send_message(chat_id, f"❌ Error: `{str(e)}`", parse_mode='Markdown')
+        finally:
+            core.active_processes.pop(file_name, None)
+            if user_id is not None:
+                core.quota_store.release_script(user_id, pending=not started)
+
+    # --- 📦 Install ---
+
+    async def install_packages(self, message):
+        core = self.core
+        project, package_name = core.split_install_target((message.text or '').strip())
+        if not package_name:
+            return await self.bot.reply_to(message, "❌ No package specified", parse_mode='Markdown')
+
+        install_id = f"{message.chat.id}_{message.message_id}"
+        progress_msg = await self.bot.reply_to(message, f"📦 *Installing:* `{package_name}`\n\n⏳ Please wait...", parse_mode='Markdown', reply_markup=core.install_cancel_keyboard(install_id))
+
+        def show_progress(run):
+            # Called on the loop by run_async; the edit must not hold up reading pip's output
+            task = asyncio.create_task(self.bot.edit_message_text(
+                core.install_progress_text(package_name, run), message.chat.id, progress_msg.message_id,
+                parse_mode='Markdown', reply_markup=core.install_cancel_keyboard(install_id)
+            ))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+        steps, cleanup = core.install_steps(project, package_name.split(), message.from_user.id)
+        run = pip_progress.PipRun(steps, show_progress, cleanup=cleanup)
+        core.active_installs[install_id] = (run, message.from_user.id)
+        try:
+            await run.run_async()
+            await self.bot.edit_message_text(core.install_report(package_name, run), message.chat.id, progress_msg.message_id, parse_mode='Markdown')
+            if run.ok and project is None:
+                for pkg in package_name.split(): core.installed_packages.add(pkg.split('==')[0].split('>=')[0])
+            outcome = "Installed" if run.ok else "Install cancelled" if run.cancelled else f"Install failed ({run.returncode})"
+            await self.in_executor(core.log_action, message.from_user.id, f"{outcome}: {package_name}")
+        except Exception as e:
+            await self.bot.edit_message_text(f"❌ *Error:* `{str(e)}`", message.chat.id, progress_msg.message_id, parse_mode='Markdown')
+        finally:
+            core.active_installs.pop(install_id, None)
+
+    # --- Lifecycle ---
+
+    async def main(self):
+        # 🌐 Ping reports event-loop lag in this mode
+        submit = asyncio.get_running_loop().call_soon_threadsafe
+        if self.core.queue_lag_probe is None:
+            self.core.queue_lag_probe = diagnostics.QueueLagProbe(submit).start()
+        else:
+            self.core.queue_lag_probe.submit = submit
+        try:
+            await self.in_executor(self.core.log_action, "system", "Async bot polling started")
+            await self.bot.infinity_polling(timeout=20)
+        finally:
+            await self.bot.close_session()
+            self.executor.shutdown(wait=False)
+
+
+def run(core):
+    """Blocking: runs the async bot until the process exits."""
+    asyncio.run(AsyncBotCore(core).main())
@@ -0,0 +1,70 @@
+"""
+Import time of a large hosted module: `spec.loader.exec_module` (compile
+from source every time) vs `bytecode_cache.exec_module` (cached code object).
+
+    python benchmarks/bench_bytecode_cache.py --functions 5000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--functions", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["BYTECODE_CACHE_DIR"] = os.path.join(tmp, "cache")
+    import bytecode_cache
+
+    module_path = os.path.join(tmp, "big_api.py")
+    with open(module_path, "w") as f:
+        for i in range(args.functions):
+            f.write(f"def handler_{i}(x):\n    return {{'id': {i}, 'value': x * {i}}}\n\n")
+
+    def load(use_cache):
+        spec = importlib.util.spec_from_file_location("big_api", module_path)
+        module = importlib.util.module_from_spec(spec)
+        started = time.perf_counter()
+        if use_cache:
+            bytecode_cache.exec_module(module, module_path)
+        else:
+            spec.loader.exec_module(module)
+        return time.perf_counter() - started
+
+    # Source path: remove __pycache__ between runs, like a non-writable uploads/
+    source = []
+    for _ in range(args.runs):
+        source.append(load(False))
+        cache = os.path.join(tmp, "__pycache__")
+        if os.path.isdir(cache):
+            for name in os.listdir(cache):
+                os.remove(os.path.join(cache, name))
+
+    bytecode_cache.load_code(module_path)  # upload-time compile
+    cached = [load(True) for _ in range(args.runs)]
+
+    results = {
+        "functions": args.functions,
+        "source_median_ms": round(statistics.median(source) * 1000, 2),
+        "cached_median_ms": round(statistics.median(cached) * 1000, 2),
+    }
+    results["speedup"] = round(results["source_median_ms"] / max(results["cached_median_ms"], 0.001), 2)
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Cold-start benchmark and time-to-first-byte regression check.
+
+    python benchmarks/bench_coldstart.py --runs 5
+    python benchmarks/bench_coldstart.py --max-ttfb-ms 300 --compare benchmarks/results/<previous>.json
+
+Starts the bot as a fresh process, both directly (`python hostingbotrenderv2.py`)
+and through coldstart.py, and polls `/` until the first 200: that is the
+TTFB a Render wake-up request sees. For coldstart.py it also waits for the
+bot to be fully loaded and collects the per-phase report from /_startup.
+With --importtime one extra run is made under `-X importtime` and the
+slowest top-level imports are listed.
+
+Exits 1 when the coldstart TTFB p50 exceeds --max-ttfb-ms or regresses by
+more than --tolerance against --compare.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import subprocess
+import http.client
+import statistics
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_e2e import percentiles
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def http_get(port, path, timeout=1.0):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def wait_for(port, path, accept, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            status, body = http_get(port, path)
+            if accept(status, body):
+                return time.perf_counter(), body
+        except OSError:
+            pass
+        time.sleep(0.005)
+    return None, None
+
+
+def start_process(cmd, port, extra_env=None):
+    env = dict(os.environ, PORT=str(port), BOT_TOKEN="123456:BENCHMARK", VENVS_ENABLED="0", FORKSERVER_ENABLED="0")
+    env.update(extra_env or {})
+    # The bot creates uploads/, logs/... in its cwd
+    workdir = tempfile.mkdtemp(prefix="bench-coldstart-")
+    process = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return process, workdir
+
+
+def one_run(mode, module, timeout):
+    port = free_port()
+    if mode == "coldstart":
+        cmd = [sys.executable, os.path.join(REPO_DIR, "coldstart.py"), module]
+    else:
+        cmd = [sys.executable, os.path.join(REPO_DIR, f"{module}.py")]
+    spawned = time.perf_counter()
+    process, workdir = start_process(cmd, port)
+    deadline = spawned + timeout
+    try:
+        first_byte, _ = wait_for(port, "/", lambda s, b: s == 200, deadline)
+        result = {"ttfb": first_byte - spawned if first_byte else None}
+        if mode == "coldstart" and first_byte:
+            ready, body = wait_for(port, "/_startup", lambda s, b: s == 200 and json.loads(b)["ready"], deadline)
+            result["ready"] = ready - spawned if ready else None
+            result["report"] = json.loads(body) if body else None
+        else:
+            result["ready"] = result["ttfb"]
+        return result
+    finally:
+        process.kill()
+        process.communicate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def import_times(module, timeout, top=15):
+    """Top-level cumulative import times (µs) from one `-X importtime` run of coldstart.py."""
+    port = free_port()
+    process, workdir = start_process([sys.executable, "-X", "importtime", os.path.join(REPO_DIR, "coldstart.py"), module], port)
+    try:
+        wait_for(port, "/_startup", lambda s, b: s == 200 and json.loads(b)["ready"], time.perf_counter() + timeout)
+    finally:
+        process.kill()
+        _, stderr = process.communicate()
+        shutil.rmtree(workdir, ignore_errors=True)
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        name = parts[2]
+        if name.startswith("  ") or not parts[1].strip().isdigit():
+            continue  # Nested import (indented) or the header line
+        rows.append((name.strip(), int(parts[1])))
+    return sorted(rows, key=lambda r: -r[1])[:top]
+
+
+def summarize(runs, key):
+    samples = [r[key] for r in runs if r.get(key) is not None]
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="hostingbotrenderv2")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("--max-ttfb-ms", type=float, help="Fail if coldstart TTFB p50 is above this")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed TTFB regression vs --compare")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results"))
+    parser.add_argument("--compare", help="Previous result JSON to check against")
+    args = parser.parse_args()
+
+    results = {"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0], "module": args.module}}
+    for mode in ("direct", "coldstart"):
+        runs = [one_run(mode, args.module, args.timeout) for _ in range(args.runs)]
+        results[mode] = {"ttfb": summarize(runs, "ttfb"), "ready": summarize(runs, "ready")}
+        reports = [r["report"] for r in runs if r.get("report")]
+        if reports:
+            phases = {}
+            for report in reports:
+                for name, ms in report["phases_ms"].items():
+                    phases.setdefault(name, []).append(ms)
+            results[mode]["phases_ms"] = {name: round(statistics.median(v), 1) for name, v in phases.items()}
+            results[mode]["slowest_imports_ms"] = reports[-1]["slowest_imports_ms"]
+    if args.importtime:
+        results["importtime_us"] = dict(import_times(args.module, args.timeout))
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    os.makedirs(args.output, exist_ok=True)
+    out_file = os.path.join(args.output, f"coldstart-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out_file, "w") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nSaved {out_file}")
+
+    ttfb = results["coldstart"]["ttfb"].get("p50_ms")
+    failures = []
+    if ttfb is None:
+        failures.append("coldstart never answered /")
+    elif args.max_ttfb_ms is not None and ttfb > args.max_ttfb_ms:
+        failures.append(f"TTFB p50 {ttfb}ms > {args.max_ttfb_ms}ms")
+    if args.compare and ttfb is not None:
+        with open(args.compare) as f:
+            previous = json.load(f)["coldstart"]["ttfb"].get("p50_ms")
+        if previous and ttfb > previous * (1 + args.tolerance):
+            failures.append(f"TTFB p50 regressed {previous}ms -> {ttfb}ms (> {args.tolerance:.0%})")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""
+End-to-end benchmark: the real bot against a local fake Bot API, plus a WSGI
+load generator against N hosted /u<id>/<name> mounts.
+
+    python benchmarks/bench_e2e.py --users 20 --actions 10 --apis 10
+    python benchmarks/bench_e2e.py --mode async --compare benchmarks/results/<previous>.json
+
+Reports updates/s, per-action handler latency percentiles (update queued ->
+bot's answering API call), hosted-API req/s and latency, update_middleware
+rebuild time and RSS. Results are written as JSON under benchmarks/results/
+so runs can be compared.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_bot_api import FakeBotAPI
+
+SCRIPT = "import time\nfor i in range(5):\n    print('line', i)\n"
+API_FILE = (
+    "from flask import Flask, jsonify\n"
+    "app = Flask(__name__)\n"
+    "@app.route('/')\n"
+    "def index():\n"
+    "    return jsonify(ok=True, items=list(range(20)))\n"
+)
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    samples = sorted(samples)
+
+    def pick(q):
+        return round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 2)
+    return {
+        "count": len(samples),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": round(samples[-1] * 1000, 2),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+    }
+
+
+def rss_mb():
+    stats = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, value = line.split(":", 1)
+                    stats["current" if key == "VmRSS" else "peak"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        import resource
+        stats["peak"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return stats
+
+
+class Driver:
+    """One outstanding action per synthetic user; completion is detected from API calls."""
+
+    def __init__(self, api, timeout):
+        self.api = api
+        self.timeout = timeout
+        self.pending = {}  # chat_id -> (predicate, started, event, slot)
+        self.lock = threading.Lock()
+        api.listeners.append(self._on_call)
+
+    def _on_call(self, method, params, now):
+        try:
+            chat_id = int(params.get("chat_id", 0) or 0)
+        except ValueError:
+            return
+        if method == "answerCallbackQuery":
+            chat_id = int(str(params.get("callback_query_id", "cq0_0"))[2:].split("_")[0] or 0)
+        with self.lock:
+            entry = self.pending.get(chat_id)
+            if entry and entry[0](method, params):
+                entry[3].append(now - entry[1])
+                del self.pending[chat_id]
+                entry[2].set()
+
+    def act(self, chat_id, kind, push, predicate):
+        event = threading.Event()
+        slot = []
+        with self.lock:
+            self.pending[chat_id] = (predicate, time.perf_counter(), event, slot)
+        push()
+        if not event.wait(self.timeout):
+            with self.lock:
+                self.pending.pop(chat_id, None)
+            return kind, None
+        return kind, slot[0]
+
+
+def any_reply(method, params):
+    return True
+
+
+def text_contains(fragment):
+    return lambda method, params: fragment in params.get("text", "")
+
+
+def run_user(driver, api, chat_id, actions):
+    results = []
+    script_name = f"bench_{chat_id}.py"
+
+    results.append(driver.act(chat_id, "upload", lambda: api.push_document(chat_id, script_name, SCRIPT.encode()), text_contains("uploaded")))
+    cycle = [
+        ("files", lambda: api.push_text(chat_id, "📂 Files"), any_reply),
+        ("status", lambda: api.push_text(chat_id, "ℹ️ Status"), any_reply),
+        ("run_menu", lambda: api.push_text(chat_id, "⚡ Run"), any_reply),
+        ("run_script", lambda: api.push_callback(chat_id, f"run_{script_name}"), text_contains("Finished")),
+    ]
+    for i in range(actions):
+        kind, push, predicate = cycle[i % len(cycle)]
+        results.append(driver.act(chat_id, kind, push, predicate))
+    return results
+
+
+def bench_bot(args, core):
+    api = FakeBotAPI().start()
+    api.point_telebot()
+    driver = Driver(api, args.timeout)
+
+    if args.mode == "async":
+        import async_core
+        threading.Thread(target=async_core.run, args=(core,), daemon=True).start()
+    else:
+        threading.Thread(target=core.bot.polling, kwargs={"none_stop": True, "interval": 0, "timeout": 1}, daemon=True).start()
+    time.sleep(0.5)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futures = [pool.submit(run_user, driver, api, 100000 + u, args.actions) for u in range(args.users)]
+        results = [r for f in futures for r in f.result()]
+    elapsed = time.perf_counter() - started
+
+    by_kind = {}
+    for kind, latency in results:
+        by_kind.setdefault(kind, []).append(latency)
+    completed = [l for _, l in results if l is not None]
+    report = {
+        "mode": args.mode,
+        "users": args.users,
+        "updates": len(results),
+        "timeouts": len(results) - len(completed),
+        "updates_per_s": round(len(completed) / elapsed, 2),
+        "latency": percentiles(completed),
+        "latency_by_action": {k: percentiles([l for l in v if l is not None]) for k, v in by_kind.items()},
+        "api_calls": dict(api.calls),
+    }
+    if args.mode != "async":
+        core.bot.stop_polling()
+    api.stop()
+    return report
+
+
+def bench_api(args, core):
+    from werkzeug.test import create_environ
+
+    paths = []
+    for i in range(args.apis):
+        file_name = f"bench_api_{i}.py"
+        file_path = os.path.join(core.UPLOAD_DIR, file_name)
+        with open(file_path, "w") as f:
+            f.write(API_FILE)
+        module_name, module = core.load_api_module(file_path, 1)
+        core.hosted_apis[file_name] = {
+            'app': module.app, 'path': f"/u1/bench_api_{i}", 'user_id': 1,
+            'module': module_name, 'project_dir': None, 'wsgi': core.TrackedApp(module.app.wsgi_app),
+        }
+        paths.append(f"/u1/bench_api_{i}/")
+
+    rebuild = []
+    for _ in range(20):
+        t = time.perf_counter()
+        core.update_middleware()
+        rebuild.append(time.perf_counter() - t)
+
+    def one_request(i):
+        environ = create_environ(paths[i % len(paths)])
+        status = []
+        t = time.perf_counter()
+        body = core.app(environ, lambda s, h, exc_info=None: status.append(s))
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+        return time.perf_counter() - t, status[0].startswith("200")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.api_threads) as pool:
+        samples = list(pool.map(one_request, range(args.api_requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mounts": args.apis,
+        "threads": args.api_threads,
+        "requests": args.api_requests,
+        "errors": sum(1 for _, ok in samples if not ok),
+        "req_per_s": round(len(samples) / elapsed, 2),
+        "latency": percentiles([l for l, _ in samples]),
+        "update_middleware": percentiles(rebuild),
+    }
+
+
+def flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(previous, current):
+    old, new = flatten(previous), flatten(current)
+    print(f"\n{'metric':60} {'before':>12} {'after':>12} {'change':>9}")
+    for key in sorted(set(old) & set(new)):
+        if old[key] == new[key] or key.startswith("meta."):
+            continue
+        change = f"{(new[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else "n/a"
+        print(f"{key:60} {old[key]:>12} {new[key]:>12} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--actions", type=int, default=8, help="Actions per user after the initial upload")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--apis", type=int, default=10)
+    parser.add_argument("--api-threads", type=int, default=8)
+    parser.add_argument("--api-requests", type=int, default=2000)
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results"))
+    parser.add_argument("--compare", help="Previous result JSON to diff against")
+    args = parser.parse_args()
+
+    args.output = os.path.abspath(args.output)
+    args.compare = args.compare and os.path.abspath(args.compare)
+
+    # The bot creates uploads/, logs/... relative to cwd and needs no real services
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    os.chdir(workdir)
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+    os.environ.setdefault("VENVS_ENABLED", "0")
+    os.environ.setdefault("FORKSERVER_ENABLED", "0")
+
+    rss_before = rss_mb()
+    import hostingbotrenderv2 as core
+
+    results = {
+        "meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0]},
+        "bot": bench_bot(args, core),
+        "api": bench_api(args, core),
+        "rss_mb": {"start": rss_before, "end": rss_mb()},
+    }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    os.makedirs(args.output, exist_ok=True)
+    out_file = os.path.join(args.output, f"e2e-{args.mode}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out_file, "w") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nSaved {out_file}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
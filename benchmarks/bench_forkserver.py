@@ -0,0 +1,86 @@
+"""
+Time-to-first-output: cold `python script.py` (current ⚡ Run path) vs a
+script forked from the warm fork server.
+
+    python benchmarks/bench_forkserver.py --runs 20 --preload requests
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forkserver import ForkServer
+
+
+def first_line_latency(process, started):
+    process.stdout.readline()
+    elapsed = time.perf_counter() - started
+    process.stdout.read()
+    process.stderr.read()
+    process.wait()
+    return elapsed
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 2),
+        "min_ms": round(samples[0] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--preload", default="requests,json")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    modules = [m for m in args.preload.split(",") if m]
+    tmp = tempfile.mkdtemp()
+    script = os.path.join(tmp, "bench_script.py")
+    with open(script, "w") as f:
+        for name in modules:
+            f.write(f"try:\n    import {name}\nexcept ImportError:\n    pass\n")
+        f.write("print('ready', flush=True)\n")
+
+    cold = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, script],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1
+        )
+        cold.append(first_line_latency(process, started))
+
+    server = ForkServer(os.path.join(tmp, "fs.sock"), preload=modules)
+    server.start()
+    warm = []
+    try:
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            warm.append(first_line_latency(server.spawn(script), started))
+    finally:
+        server.stop()
+
+    results = {
+        "preload": modules,
+        "popen": summarize(cold),
+        "forkserver": summarize(warm),
+    }
+    results["speedup"] = round(results["popen"]["median_ms"] / max(results["forkserver"]["median_ms"], 0.001), 2)
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Local stand-in for the Telegram Bot API, for benchmarks.
+
+Implements just what the bot uses: getMe, getUpdates (long polling from an
+in-memory queue), sendMessage, editMessageText, answerCallbackQuery, getFile
+and file downloads. Every bot -> API call is timestamped so the load driver
+can match responses to the synthetic update that caused them.
+
+    api = FakeBotAPI().start()
+    api.point_telebot()          # sync TeleBot and AsyncTeleBot both
+    api.push_text(chat_id, "📂 Files")
+"""
+import json
+import time
+import queue
+import threading
+import itertools
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPONSE_METHODS = {"sendMessage", "editMessageText", "answerCallbackQuery", "sendDocument"}
+
+
+class FakeBotAPI:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.updates = queue.Queue()
+        self.files = {}  # file_id -> bytes
+        self.calls = {}  # method -> count
+        self.listeners = []  # callables(method, params, timestamp)
+        self._lock = threading.Lock()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1000)
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def point_telebot(self):
+        from telebot import apihelper, asyncio_helper
+        apihelper.API_URL = self.base_url + "/bot{0}/{1}"
+        apihelper.FILE_URL = self.base_url + "/file/bot{0}/{1}"
+        asyncio_helper.API_URL = self.base_url + "/bot{0}/{1}"
+        asyncio_helper.FILE_URL = self.base_url + "/file/bot{0}/{1}"
+
+    # --- Synthetic updates ---
+
+    def _user(self, chat_id):
+        return {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"}
+
+    def _message(self, chat_id, **fields):
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": self._user(chat_id),
+        }
+        message.update(fields)
+        return message
+
+    def push_text(self, chat_id, text):
+        self.updates.put({"update_id": next(self._update_ids), "message": self._message(chat_id, text=text)})
+
+    def push_document(self, chat_id, file_name, data):
+        file_id = f"file{next(self._update_ids)}"
+        self.files[file_id] = data
+        document = {"file_id": file_id, "file_unique_id": file_id, "file_name": file_name, "file_size": len(data)}
+        self.updates.put({"update_id": next(self._update_ids), "message": self._message(chat_id, document=document)})
+
+    def push_callback(self, chat_id, data):
+        update_id = next(self._update_ids)
+        self.updates.put({
+            "update_id": update_id,
+            "callback_query": {
+                # Encodes the chat so answerCallbackQuery can be matched back to a user
+                "id": f"cq{chat_id}_{update_id}",
+                "from": self._user(chat_id),
+                "chat_instance": str(chat_id),
+                "data": data,
+                "message": self._message(chat_id, text="menu", **{"from": {"id": 1, "is_bot": True, "first_name": "bot"}}),
+            },
+        })
+
+    # --- HTTP side ---
+
+    def _result(self, method, params):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        if method == "getUpdates":
+            timeout = float(params.get("timeout", 0) or 0)
+            batch = []
+            try:
+                batch.append(self.updates.get(timeout=max(timeout, 0.01)))
+                while len(batch) < 100:
+                    batch.append(self.updates.get_nowait())
+            except queue.Empty:
+                pass
+            return batch
+        if method == "getFile":
+            file_id = params.get("file_id")
+            return {"file_id": file_id, "file_unique_id": file_id,
+                    "file_size": len(self.files.get(file_id, b"")), "file_path": f"documents/{file_id}"}
+        if method in ("sendMessage", "editMessageText", "sendDocument"):
+            chat_id = int(params.get("chat_id", 0) or 0)
+            return {"message_id": next(self._message_ids), "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"}, "text": params.get("text", "")}
+        return True
+
+    def _record(self, method, params):
+        now = time.perf_counter()
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if method in RESPONSE_METHODS:
+            for listener in self.listeners:
+                listener(method, params, now)
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _params(self):
+                url = urlparse(self.path)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                content_type = self.headers.get("Content-Type", "")
+                if body and content_type.startswith("application/x-www-form-urlencoded"):
+                    params.update({k: v[-1] for k, v in parse_qs(body.decode()).items()})
+                elif body and content_type.startswith("multipart/form-data"):
+                    raw = b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+                    for part in BytesParser(policy=HTTP).parsebytes(raw).iter_parts():
+                        name = part.get_param("name", header="content-disposition")
+                        if name and not part.get_filename():
+                            params[name] = part.get_content()
+                return url.path, params
+
+            def _send(self, status, payload, content_type="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _dispatch(self):
+                path, params = self._params()
+                parts = path.strip("/").split("/")
+                if parts[0] == "file":
+                    data = api.files.get(parts[-1])
+                    if data is None:
+                        return self._send(404, b"not found", "text/plain")
+                    return self._send(200, data, "application/octet-stream")
+                method = parts[-1]
+                api._record(method, params)
+                result = api._result(method, params)
+                self._send(200, json.dumps({"ok": True, "result": result}).encode())
+
+            do_GET = _dispatch
+            do_POST = _dispatch
+
+        return Handler
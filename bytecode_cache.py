@@ -0,0 +1,111 @@
+"""
+Bytecode cache for uploaded Python files.
+
+Uploads are compiled once in `handle_document` and the code object is stored
+under CACHE_DIR, keyed by a hash of the upload path plus a hash of its
+contents. Run and Host API then load the cached code object instead of
+recompiling from source (`uploads/` may not be writable for __pycache__).
+
+Also usable as a runner, so `⚡ Run` executes the cached bytecode:
+    python bytecode_cache.py uploads/script.py [args...]
+"""
+import os
+import sys
+import glob
+import types
+import marshal
+import hashlib
+import builtins
+import importlib.util
+
+# Absolute, and exported so runners started with cwd=<project> (and forked
+# fork-server children that chdir) read the cache warmed by the bot
+CACHE_DIR = os.path.abspath(os.environ.get("BYTECODE_CACHE_DIR", os.path.join("cache", "bytecode")))
+os.environ["BYTECODE_CACHE_DIR"] = CACHE_DIR
+RUNNER = os.path.abspath(__file__)
+
+# Entries from another interpreter version are simply never looked up
+_TAG = sys.implementation.cache_tag or "py"
+
+
+def _path_key(file_path):
+    return hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()[:16]
+
+
+def _cache_file(file_path, data):
+    content_key = hashlib.sha256(data).hexdigest()[:32]
+    return os.path.join(CACHE_DIR, f"{_path_key(file_path)}-{content_key}.{_TAG}.bin")
+
+
+def invalidate(file_path):
+    """Drop every cached version of `file_path`."""
+    for cached in glob.glob(os.path.join(CACHE_DIR, f"{_path_key(file_path)}-*")):
+        try:
+            os.remove(cached)
+        except OSError:
+            pass
+
+
+def load_code(file_path, data=None):
+    """
+    Returns the code object for `file_path`, compiling and caching it on a miss.
+    Raises SyntaxError (or ValueError for null bytes) for invalid sources.
+    """
+    if data is None:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    cache_file = _cache_file(file_path, data)
+
+    try:
+        with open(cache_file, 'rb') as f:
+            header = f.read(len(importlib.util.MAGIC_NUMBER))
+            if header == importlib.util.MAGIC_NUMBER:
+                return marshal.loads(f.read())
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+
+    code = compile(data, file_path, 'exec', dont_inherit=True)
+
+    # New content for this path: older versions are dead weight
+    invalidate(file_path)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(importlib.util.MAGIC_NUMBER)
+            f.write(marshal.dumps(code))
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # Caching is an optimization, the compiled code is still valid
+        pass
+    return code
+
+
+def exec_module(module, file_path):
+    """Drop-in for `spec.loader.exec_module(module)` using cached bytecode."""
+    code = load_code(file_path)
+    module.__file__ = file_path
+    exec(code, module.__dict__)
+
+
+def run_main(file_path, argv=None):
+    """Runs `file_path` as __main__ from cached bytecode (like `python file_path`)."""
+    code = load_code(file_path)
+    main = types.ModuleType("__main__")
+    main.__file__ = file_path
+    main.__builtins__ = builtins
+    sys.modules["__main__"] = main
+    sys.argv = [file_path] + list(argv or [])
+    script_dir = os.path.dirname(os.path.abspath(file_path))
+    if sys.path and sys.path[0] == os.path.dirname(RUNNER):
+        sys.path[0] = script_dir
+    else:
+        sys.path.insert(0, script_dir)
+    exec(code, main.__dict__)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("usage: python bytecode_cache.py <file.py> [args...]", file=sys.stderr)
+        sys.exit(2)
+    run_main(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,225 @@
+"""
+Fast cold start for Render wake-ups.
+
+    python coldstart.py                       # hostingbotrenderv2
+    python coldstart.py hostingbotrender
+
+Render spins free instances down and the first request wakes them up. Run
+directly, the bot scripts import telebot, Flask and werkzeug, create
+directories and configure logging before the port is bound. This launcher
+uses only the standard library until $PORT is bound and answering `/`. The
+bot module is then imported and its start_services() run on a background
+thread, after which every request is served by the module's Flask app
+(other paths get 503 + Retry-After meanwhile).
+
+Responses whose body is a static_files.FileRange (published files, and
+Flask's send_file since it is offered as wsgi.file_wrapper) are written
+with os.sendfile.
+
+Per-phase timings (interpreter start, bind, import with the slowest direct
+dependencies, services) are printed once ready and served as JSON at
+/_startup; benchmarks/bench_coldstart.py uses them to regression-test
+time-to-first-byte.
+"""
+import os
+import sys
+import json
+import time
+import builtins
+import importlib
+import threading
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, ServerHandler
+
+LAUNCHED = time.perf_counter()
+DEFAULT_MODULE = "hostingbotrenderv2"
+STARTUP_PATH = "/_startup"
+
+
+def process_age():
+    """Seconds since the kernel started this process (includes interpreter startup)."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class ImportTimer:
+    """
+    Cumulative time of each import executed directly by the module being
+    loaded (like the top level of `-X importtime`), measured on one thread.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self._depth = 0
+        self._thread = None
+        self._original = None
+
+    def __enter__(self):
+        self._thread = threading.get_ident()
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if threading.get_ident() != self._thread or level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.times[name] = self.times.get(name, 0) + time.perf_counter() - started
+
+    def slowest(self, n=8):
+        return sorted(self.times.items(), key=lambda item: -item[1])[:n]
+
+
+class StartupApp:
+    """Answers health checks while the bot module loads, then hands every request to it."""
+
+    def __init__(self):
+        self.target = None
+        self.error = None
+        self.phases = [("interpreter", process_age())]
+        self.imports = []
+        self.total_ms = None
+
+    def phase(self, name, since):
+        self.phases.append((name, time.perf_counter() - since))
+
+    def elapsed_ms(self):
+        return round((self.phases[0][1] + time.perf_counter() - LAUNCHED) * 1000, 1)
+
+    def report(self):
+        return {
+            "ready": self.target is not None,
+            "error": self.error,
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases},
+            "total_ms": self.total_ms if self.total_ms is not None else self.elapsed_ms(),
+            "slowest_imports_ms": {name: round(seconds * 1000, 1) for name, seconds in self.imports},
+        }
+
+    def _respond(self, start_response, status, body, content_type="text/plain", extra=()):
+        body = body.encode()
+        start_response(status, [("Content-Type", content_type), ("Content-Length", str(len(body)))] + list(extra))
+        return [body]
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "/")
+        if path == STARTUP_PATH:
+            return self._respond(start_response, "200 OK", json.dumps(self.report()), "application/json")
+        target = self.target
+        if target is not None:
+            return target(environ, start_response)
+        if self.error is not None:
+            return self._respond(start_response, "500 Internal Server Error", f"Startup failed: {self.error}")
+        if path == "/":
+            return self._respond(start_response, "200 OK", "Bot is starting... Web server is active.")
+        return self._respond(start_response, "503 Service Unavailable", "Starting up, retry shortly.", extra=[("Retry-After", "2")])
+
+    def load(self, module_name):
+        try:
+            # Imported after the bind, like everything else not needed for `/`
+            from static_files import FileRange
+            SendfileHandler.wsgi_file_wrapper = FileRange
+
+            started = time.perf_counter()
+            with ImportTimer() as timer:
+                module = importlib.import_module(module_name)
+            self.imports = timer.slowest()
+            self.phase(f"import {module_name}", started)
+
+            started = time.perf_counter()
+            module.start_services()
+            self.phase("start_services", started)
+
+            self.total_ms = self.elapsed_ms()
+            self.target = module.app
+            self.print_report()
+        except BaseException as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"❌ Startup failed: {self.error}", flush=True)
+            raise
+
+    def print_report(self):
+        report = self.report()
+        print(f"⏱️ Startup ready in {report['total_ms']:.0f}ms", flush=True)
+        for name, ms in report["phases_ms"].items():
+            print(f"   {name:39} {ms:8.1f}ms", flush=True)
+        for name, ms in report["slowest_imports_ms"].items():
+            print(f"     import {name:32} {ms:8.1f}ms", flush=True)
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class SendfileHandler(ServerHandler):
+    """Sends FileRange bodies (static files, Flask send_file) with os.sendfile."""
+
+    def sendfile(self):
+        body = self.result
+        try:
+            body.filelike.fileno()
+            offset, length = body.offset, body.length
+        except (AttributeError, OSError):
+            return False  # Not a FileRange, or not backed by a real file
+        if length is None:
+            return False  # FileRange over a stream, iterated instead
+        if not self.headers_sent:
+            self.send_headers()
+        self._flush()
+        if self.environ.get("REQUEST_METHOD") != "HEAD" and length > 0:
+            self.bytes_sent += self.request_handler.connection.sendfile(body.filelike, offset, length)
+        return True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def handle(self):
+        # WSGIRequestHandler.handle() with the sendfile-capable ServerHandler
+        self.raw_requestline = self.rfile.readline(65537)
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            return
+        if not self.parse_request():
+            return
+        handler = SendfileHandler(self.rfile, self.wfile, self.get_stderr(), self.get_environ(), multithread=True)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+
+def main():
+    module_name = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODULE
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    startup = StartupApp()
+
+    started = time.perf_counter()
+    port = int(os.environ.get("PORT", 5000))
+    server = ThreadingWSGIServer(("0.0.0.0", port), QuietHandler)
+    server.set_app(startup)
+    startup.phase("bind", started)
+    print(f"🚀 Port {port} bound, loading {module_name} in the background...", flush=True)
+
+    threading.Thread(target=startup.load, args=(module_name,), name="coldstart-load", daemon=True).start()
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Cheap runtime diagnostics for the 🌐 Ping panel.
+
+Everything here is either a counter filled in as a side effect of normal work
+(LatencyWindow fed by the WSGI wrapper, QueueLagProbe ticking in the
+background) or a single read from /proc, so building the panel costs
+milliseconds and never competes with hosted APIs for bandwidth or CPU.
+"""
+import os
+import time
+import shutil
+import threading
+from collections import deque
+
+LAG_PROBE_INTERVAL = float(os.environ.get("LAG_PROBE_INTERVAL", "5"))
+
+
+class LatencyWindow:
+    """The last `maxlen` samples (seconds); deque appends are thread-safe."""
+
+    def __init__(self, maxlen=1000):
+        self.samples = deque(maxlen=maxlen)
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return None
+
+        def pick(q):
+            return samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+        return {'count': len(samples), 'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'max_ms': samples[-1] * 1000}
+
+
+class QueueLagProbe:
+    """
+    Every `interval` seconds hands a no-op to `submit(func)` (the bot's worker
+    pool, the event loop...) and records how long it waited before running.
+    """
+
+    def __init__(self, submit, interval=LAG_PROBE_INTERVAL):
+        self.submit = submit
+        self.interval = interval
+        self.window = LatencyWindow(maxlen=120)
+
+    def _tick(self):
+        queued = time.perf_counter()
+        self.submit(lambda: self.window.record(time.perf_counter() - queued))
+
+    def start(self):
+        def loop():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self._tick()
+                except Exception:
+                    pass
+        threading.Thread(target=loop, name="queue-lag-probe", daemon=True).start()
+        return self
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def child_process_count():
+    """Direct children of this process (scripts, fork server, pip), None if /proc is unavailable."""
+    pid = str(os.getpid())
+    count = 0
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # "pid (comm) state ppid ...": comm may contain spaces, split after it
+                if f.read().rsplit(")", 1)[1].split()[1] == pid:
+                    count += 1
+        except (OSError, IndexError):
+            pass
+    return count
+
+
+def system_snapshot(path="."):
+    try:
+        load = os.getloadavg()
+    except OSError:
+        load = None
+    disk = shutil.disk_usage(path)
+    return {
+        'threads': threading.active_count(),
+        'children': child_process_count(),
+        'rss': rss_bytes(),
+        'loadavg': load,
+        'cpus': os.cpu_count(),
+        'disk_free': disk.free,
+        'disk_total': disk.total,
+    }
@@ -0,0 +1,293 @@
+"""
+Pre-warmed interpreter pool for the ⚡ Run flow.
+
+A long-lived parent process imports a configurable set of heavy modules once
+and then forks an isolated child per script run. The bot hands the parent the
+write ends of two pipes, so the child's stdout/stderr land in the same
+line-by-line capture loop used for the regular `subprocess.Popen` path.
+
+Run standalone (started automatically by ForkServer):
+    python forkserver.py --socket /tmp/fs.sock --preload requests,json
+"""
+import os
+import sys
+import json
+import select
+import signal
+import socket
+import argparse
+import importlib
+import selectors
+import subprocess
+import threading
+import traceback
+
+
+# --- Server side (runs in the warm parent) ---
+
+def _preload(modules):
+    loaded = []
+    for name in modules:
+        name = name.strip()
+        if not name:
+            continue
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            # A missing optional module must never stop the server from booting
+            pass
+    return loaded
+
+
+def _run_child(script_path, out_fd, err_fd, cwd=None, extra_path=()):
+    # Runs inside the forked child, never returns
+    os.setsid()
+    if cwd:
+        os.chdir(cwd)
+    # After sys.path[0], which run_main swaps for the script's directory
+    sys.path[1:1] = list(extra_path or ())
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    os.dup2(out_fd, 1)
+    os.dup2(err_fd, 2)
+    os.close(out_fd)
+    os.close(err_fd)
+    sys.stdout = os.fdopen(1, 'w', buffering=1)
+    sys.stderr = os.fdopen(2, 'w', buffering=1)
+
+    code = 0
+    try:
+        import bytecode_cache
+        bytecode_cache.run_main(script_path)
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(code)
+
+
+def _send_line(conn, payload):
+    try:
+        conn.sendall((json.dumps(payload) + "\n").encode())
+    except OSError:
+        pass
+
+
+def serve(socket_path, preload):
+    loaded = _preload(preload)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(64)
+
+    # Tell the bot we're warm (it waits on our stdout for this line)
+    print(json.dumps({"ready": True, "preloaded": loaded}), flush=True)
+
+    sel = selectors.DefaultSelector()
+    sel.register(server, selectors.EVENT_READ)
+    children = {}  # pid -> client connection waiting for the exit code
+
+    while True:
+        for key, _ in sel.select(timeout=0.1):
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                continue
+            try:
+                msg, fds, _, _ = socket.recv_fds(conn, 4096, 2)
+                request = json.loads(msg.decode())
+                if len(fds) != 2:
+                    raise ValueError("expected stdout/stderr descriptors")
+            except Exception as e:
+                _send_line(conn, {"error": str(e)})
+                conn.close()
+                continue
+
+            pid = os.fork()
+            if pid == 0:
+                sel.close()
+                server.close()
+                conn.close()
+                _run_child(request["path"], fds[0], fds[1], request.get("cwd"), request.get("sys_path"))
+
+            for fd in fds:
+                os.close(fd)
+            _send_line(conn, {"pid": pid})
+            children[pid] = conn
+
+        # Reap finished children and report their exit codes
+        while children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            conn = children.pop(pid, None)
+            if conn is not None:
+                _send_line(conn, {"exit": os.waitstatus_to_exitcode(status)})
+                conn.close()
+
+
+# --- Client side (runs in the bot) ---
+
+class _LineConn:
+    # Newline-delimited JSON over a unix socket, without makefile() so a
+    # zero-timeout poll never leaves the stream in a broken state
+    def __init__(self, conn):
+        self.conn = conn
+        self.buffer = b""
+
+    def read(self, timeout=None):
+        while b"\n" not in self.buffer:
+            if timeout is not None:
+                ready, _, _ = select.select([self.conn], [], [], timeout)
+                if not ready:
+                    return None
+            chunk = self.conn.recv(4096)
+            if not chunk:
+                return {}
+            self.buffer += chunk
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def close(self):
+        self.conn.close()
+
+
+class ForkedProcess:
+    """Popen-like handle for a script forked by the warm parent."""
+
+    def __init__(self, conn, pid, stdout, stderr):
+        self._conn = conn
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self._lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        with self._lock:
+            if self.returncode is not None:
+                return self.returncode
+            reply = self._conn.read(timeout)
+            if reply is None:
+                raise subprocess.TimeoutExpired(str(self.pid), timeout)
+            self.returncode = reply.get("exit", -1)
+            self._conn.close()
+            return self.returncode
+
+    def poll(self):
+        if self.returncode is None:
+            try:
+                self.wait(timeout=0)
+            except subprocess.TimeoutExpired:
+                pass
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.returncode is not None:
+            return
+        try:
+            os.killpg(self.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class ForkServer:
+    """Starts the warm parent on first use and forks runs from it."""
+
+    def __init__(self, socket_path, preload=(), python=sys.executable):
+        self.socket_path = socket_path
+        self.preload = [m for m in preload if m]
+        self.python = python
+        self.preloaded = []
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                return
+            self._proc = subprocess.Popen(
+                [self.python, os.path.abspath(__file__),
+                 "--socket", self.socket_path,
+                 "--preload", ",".join(self.preload)],
+                stdout=subprocess.PIPE, text=True
+            )
+            # Blocks until the preload imports are done
+            line = self._proc.stdout.readline()
+            if not line:
+                self._proc.kill()
+                self._proc = None
+                raise RuntimeError("fork server failed to start")
+            self.preloaded = json.loads(line).get("preloaded", [])
+
+    def stop(self):
+        with self._lock:
+            if self._proc is not None:
+                self._proc.terminate()
+                self._proc.wait()
+                self._proc = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def spawn(self, script_path, cwd=None, sys_path=()):
+        self.start()
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(self.socket_path)
+            socket.send_fds(conn, [json.dumps({"path": script_path, "cwd": cwd, "sys_path": list(sys_path)}).encode()], [out_w, err_w])
+        except Exception:
+            conn.close()
+            for fd in (out_r, err_r):
+                os.close(fd)
+            raise
+        finally:
+            os.close(out_w)
+            os.close(err_w)
+
+        conn = _LineConn(conn)
+        reply = conn.read()
+        if "pid" not in reply:
+            conn.close()
+            os.close(out_r)
+            os.close(err_r)
+            raise RuntimeError(f"fork server error: {reply.get('error')}")
+
+        stdout = open(out_r, 'r', buffering=1, errors='replace')
+        stderr = open(err_r, 'r', buffering=1, errors='replace')
+        return ForkedProcess(conn, reply["pid"], stdout, stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--preload", default="")
+    args = parser.parse_args()
+    serve(args.socket, args.preload.split(","))
@@ -408,11 +408,15 @@ def run_bot_polling():
             log_action("system", f"Bot polling error: {e}, restarting in 5s...")
             time.sleep(5)
 
-if __name__ == '__main__':
-    # 1. Start Bot Polling in Thread
+def start_services():
+    # Everything except the web server (coldstart.py calls this after binding the port)
     bot_thread = threading.Thread(target=run_bot_polling)
     bot_thread.daemon = True
     bot_thread.start()
+
+if __name__ == '__main__':
+    # 1. Start Bot Polling in Thread
+    start_services()
     
     # 2. Run Flask App (Main thread for Render)
     # Render expects the app to bind to the port in the PORT env var
@@ -7,8 +7,14 @@ import importlib
 import importlib.util
 import sys
 import json
+import re
+import gc
+import shutil
+import itertools
+import tempfile
 import traceback
 from datetime import datetime
+from urllib.parse import quote
 from telebot import types
 import logging
 from logging.handlers import RotatingFileHandler
@@ -16,6 +22,19 @@ from logging.handlers import RotatingFileHandler
 # --- Flask Imports for Render & API Hosting ---
 from flask import Flask, request
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from werkzeug.wsgi import ClosingIterator
+
+import bytecode_cache
+import diagnostics
+import keepwarm
+import pip_progress
+import projects
+import quotas
+import static_files
+import venvs
+from profiler import SamplingProfiler, HandlerTimer
+from router import Router
+from scheduler import Scheduler, ScheduleError
 
 # --- Configuration ---
 # Use environment variables for Render, fallback to hardcoded for local testing
@@ -23,6 +42,19 @@ BOT_TOKEN = os.environ.get("BOT_TOKEN", "7553104853:AAFl4aTRvSbGrR0nkEHpfYBoCp6r
 ADMIN_ID = int(os.environ.get("ADMIN_ID", "2052400282"))
 RENDER_EXTERNAL_URL = os.environ.get("RENDER_EXTERNAL_HOSTNAME", "localhost:5000")
 
+# Hot reload: how long a replaced API may keep serving in-flight requests
+API_DRAIN_TIMEOUT = int(os.environ.get("API_DRAIN_TIMEOUT", "30"))
+
+# Fork-server mode: scripts are forked from a warm parent with these modules preloaded
+FORKSERVER_ENABLED = os.environ.get("FORKSERVER_ENABLED", "0") == "1"
+FORKSERVER_PRELOAD = os.environ.get("FORKSERVER_PRELOAD", "requests,json,datetime").split(",")
+
+# "sync" (TeleBot + threads) or "async" (AsyncTeleBot core, see async_core.py)
+BOT_MODE = os.environ.get("BOT_MODE", "sync")
+
+# Per-project virtualenvs: user installs never touch the bot's own interpreter
+VENVS_ENABLED = os.environ.get("VENVS_ENABLED", "1") == "1"
+
 bot = telebot.TeleBot(BOT_TOKEN)
 
 # Setup Flask App (Required for Render Web Service)
@@ -33,14 +65,20 @@ app = Flask(__name__)
 def home():
     return "Bot is running! Web server is active."
 
+# The bot's own WSGI app, hosted APIs are dispatched in front of it
+flask_wsgi_app = app.wsgi_app
+
 # --- Directories & Logging ---
 UPLOAD_DIR = "uploads"
 LOG_DIR = "logs"
+DATA_DIR = "data"
 
 if not os.path.exists(UPLOAD_DIR):
     os.makedirs(UPLOAD_DIR)
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
+if not os.path.exists(DATA_DIR):
+    os.makedirs(DATA_DIR)
 
 # Setup Rotating Logs
 log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
@@ -53,10 +91,55 @@ logger.addHandler(log_handler)
 
 # State management
 active_processes = {}
-# Structure: { "Filename": { "app": FlaskAppObj, "path": "/uID/Filename", "user_id": ID } }
+# Structure: { "Filename": { "app": FlaskAppObj, "path": "/uID/Filename", "user_id": ID,
+#                            "module": "api_module_...", "wsgi": TrackedApp } }
 hosted_apis = {} 
+# Held while hosted_apis changes and the dispatcher is rebuilt, so a reload
+# finishing late can't remount an API that was stopped or reloaded meanwhile
+hosted_apis_lock = threading.RLock()
+api_import_lock = threading.Lock()
+# Hosted API module name -> env site-packages kept at the end of sys.path for it
+api_site_dirs = {}
+api_module_counter = itertools.count(1)
 bot_status = "running"
 installed_packages = set()
+# (env, package) pairs already auto-installed into a virtualenv
+env_packages = set()
+# Running 📦 Install jobs: "<chat id>_<message id>" -> (PipRun, user id), for ✖️ Cancel
+active_installs = {}
+
+# Recent hosted-API request latencies and the bot's handler queue lag (🌐 Ping)
+wsgi_latency = diagnostics.LatencyWindow()
+queue_lag_probe = None
+
+# Keyboard texts and callback prefixes dispatch through one dict/trie lookup;
+# installed on the bot once every route below is declared
+handler_timer = HandlerTimer()
+router = Router(handler_timer)
+
+# Per-user counters (bytes, files, scripts, APIs, requests/day); the admin is exempt
+quota_store = quotas.QuotaStore(os.path.join(DATA_DIR, 'quotas.json'), exempt={ADMIN_ID})
+
+# Uploads published with 🔗 Publish, served at /files/<user_id>/<name> (see static_files.py)
+static_registry = static_files.StaticRegistry(os.path.join(DATA_DIR, 'static.json'))
+static_app = static_files.StaticApp(static_registry, UPLOAD_DIR, quota_store.allow_request)
+
+# Self-ping while idle so Render does not spin the instance down (see keepwarm.py)
+keep_warm = keepwarm.KeepWarm(
+    os.path.join(DATA_DIR, 'keepwarm.json'),
+    lambda: keepwarm.KEEPWARM_URL or public_base_url(),
+    touch=lambda count: touch_top_apis(count)
+)
+
+fork_server = None
+# Forked children inherit the bot's interpreter and site-packages, which would defeat
+# per-user envs: with venvs every script starts from its env's own python instead
+if FORKSERVER_ENABLED and not VENVS_ENABLED:
+    from forkserver import ForkServer
+    fork_server = ForkServer(
+        os.path.join(tempfile.gettempdir(), f"hostingbot_forkserver_{os.getpid()}.sock"),
+        preload=FORKSERVER_PRELOAD
+    )
 
 # --- Helper Functions ---
 
@@ -73,7 +156,7 @@ def log_action(user_id, action, details=""):
     except Exception as e:
         print(f"Logging error: {e}")
 
-def check_and_install_requirements(file_path):
+def check_and_install_requirements(file_path, user_id=None):
     try:
         with open(file_path, 'r') as f:
             content = f.read()
@@ -83,37 +166,318 @@ def check_and_install_requirements(file_path):
             line = line.strip()
             if line.startswith('import ') or line.startswith('from '):
                 parts = line.split()
-                pkg = parts[1].split('.')[0] if line.startswith('import ') else parts[1].split('.')[0]
-                builtin = ['os', 'sys', 'json', 'datetime', 'time', 'logging', 'threading', 'math', 'random', 'flask', 'werkzeug']
+                pkg = parts[1].split('.')[0].rstrip(',') if line.startswith('import ') else parts[1].split('.')[0]
+                builtin = ['os', 'sys', 'json', 'datetime', 'time', 'logging', 'threading', 'math', 'random']
+                # Scripts share the bot's Flask only when they run in the bot's interpreter
+                if not VENVS_ENABLED: builtin += ['flask', 'werkzeug']
                 if pkg not in builtin:
                     required_packages.add(pkg)
         
+        env = upload_env(None, user_id) if VENVS_ENABLED else None
+        # Auto-installs are remembered per env with venvs, per package otherwise
+        done = env_packages if VENVS_ENABLED else installed_packages
         for pkg in required_packages:
-            if pkg not in installed_packages:
-                try:
+            key = (env, pkg) if VENVS_ENABLED else pkg
+            if key in done:
+                continue
+            try:
+                if VENVS_ENABLED:
+                    venvs.install(env, [pkg])
+                else:
                     subprocess.check_call([sys.executable, "-m", "pip", "install", pkg])
-                    installed_packages.add(pkg)
-                    log_action("system", f"Installed package: {pkg}")
-                except: pass
+                done.add(key)
+                installed_packages.add(pkg)
+                log_action("system", f"Installed package: {pkg}")
+            except: pass
         return list(required_packages)
     except Exception as e:
         logger.error(f"Requirement check error: {e}")
         return []
 
+def install_requirements_file(req_path, env=None):
+    # One batched pip resolve for a whole project instead of per-import installs
+    if VENVS_ENABLED:
+        venvs.install(env, requirements_file=req_path)
+        log_action("system", f"Installed requirements: {req_path} ({env})")
+        return
+    result = subprocess.run(
+        [sys.executable, "-m", "pip", "install", "-r", req_path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip()[-500:] or "pip install -r failed")
+    log_action("system", f"Installed requirements: {req_path}")
+
+def list_uploads():
+    # Plain files plus extracted projects (shown as "name/"); hidden staging dirs are skipped
+    entries = []
+    for f in os.listdir(UPLOAD_DIR):
+        if f.startswith('.'):
+            continue
+        entries.append(f + '/' if os.path.isdir(os.path.join(UPLOAD_DIR, f)) else f)
+    return entries
+
+def resolve_upload(file_name):
+    """Returns (script_path, project_dir) for a file or a "project/" entry."""
+    if file_name.endswith('/'):
+        project_dir = os.path.abspath(os.path.join(UPLOAD_DIR, file_name.rstrip('/')))
+        return projects.find_entry_point(project_dir), project_dir
+    return os.path.join(UPLOAD_DIR, file_name), None
+
+def upload_env(project_dir, user_id=None):
+    """Name of the virtualenv a file runs in: one per project, one per owner for loose files."""
+    return venvs.env_name(os.path.basename(project_dir) if project_dir else None, user_id)
+
+def upload_owner(file_name, user_id):
+    """Whose env a loose upload uses: its owner, or `user_id` for files that predate quotas."""
+    owner = quota_store.owner(file_name)
+    return owner if owner is not None else user_id
+
+def upload_stem(file_name):
+    return file_name.rstrip('/').replace('.py', '')
+
+def remove_upload(file_name):
+    quota_store.record_delete(file_name)
+    static_registry.unpublish(file_name)
+    static_app.forget(file_name)
+    file_path, project_dir = resolve_upload(file_name)
+    if project_dir:
+        for py_file in projects.iter_python_files(project_dir):
+            bytecode_cache.invalidate(py_file)
+        shutil.rmtree(project_dir)
+        venvs.remove_env(upload_env(project_dir))
+    else:
+        os.remove(file_path)
+        bytecode_cache.invalidate(file_path)
+
+class TrackedApp:
+    """WSGI wrapper counting in-flight requests so a replaced API can drain."""
+
+    def __init__(self, wsgi_app, user_id=None):
+        self.wsgi_app = wsgi_app
+        self.user_id = user_id  # Owner billed for requests/day, None = unmetered
+        self.in_flight = 0
+        self.requests = 0  # Served since load, ranks APIs for keep-warm pre-touching
+        self.threads = {}  # thread ident -> requests it is serving (for per-API profiling)
+        self.lock = threading.Lock()
+
+    def _release(self, ident, started):
+        wsgi_latency.record(time.perf_counter() - started)
+        with self.lock:
+            self.in_flight -= 1
+            if self.threads.get(ident, 0) <= 1:
+                self.threads.pop(ident, None)
+            else:
+                self.threads[ident] -= 1
+
+    def __call__(self, environ, start_response):
+        if self.user_id is not None and not quota_store.allow_request(self.user_id):
+            start_response('429 Too Many Requests', [('Content-Type', 'text/plain'), ('Retry-After', '3600')])
+            return [b"Daily request quota exceeded\n"]
+        ident = threading.get_ident()
+        started = time.perf_counter()
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.threads[ident] = self.threads.get(ident, 0) + 1
+        try:
+            result = self.wsgi_app(environ, start_response)
+        except Exception:
+            self._release(ident, started)
+            raise
+        if isinstance(result, static_files.FileRange):
+            # Left unwrapped so the server can still sendfile() it (Flask send_file)
+            result.on_close.append(lambda: self._release(ident, started))
+            return result
+        return ClosingIterator(result, lambda: self._release(ident, started))
+
+    def active_threads(self):
+        with self.lock:
+            return set(self.threads)
+
 def update_middleware():
     """
     Updates the Flask DispatcherMiddleware with currently hosted APIs.
     This effectively mounts/unmounts apps at runtime.
     """
     # Rebuild the mount dictionary
-    mounts = {}
-    for name, info in hosted_apis.items():
-        # info['app'] is the user's Flask app
-        mounts[info['path']] = info['app'].wsgi_app
+    mounts = {static_files.STATIC_PREFIX: static_app}
+    for name, info in list(hosted_apis.items()):
+        mounts[info['path']] = info['wsgi']
     
-    # Wrap the main app with the new mounts
-    # app is the main bot app
-    app.wsgi_app = DispatcherMiddleware(app, mounts)
+    # Single attribute swap: new requests see the new mounts, in-flight
+    # requests finish on the dispatcher they started with
+    app.wsgi_app = keep_warm.middleware(DispatcherMiddleware(flask_wsgi_app, mounts))
+
+# Published files are served from the start, before any API is hosted
+update_middleware()
+
+def public_base_url():
+    return f"https://{RENDER_EXTERNAL_URL}" if "render" in RENDER_EXTERNAL_URL else f"http://{RENDER_EXTERNAL_URL}"
+
+def touch_top_apis(count):
+    """GETs / of the `count` most requested hosted APIs in-process (no quota, no latency stats)."""
+    from werkzeug.test import EnvironBuilder, run_wsgi_app
+    busiest = sorted(hosted_apis.items(), key=lambda item: -item[1]['wsgi'].requests)
+    touched = []
+    for name, info in busiest[:count]:
+        if not info['wsgi'].requests:
+            break
+        environ = EnvironBuilder(path='/', base_url=f"http://localhost{info['path']}", headers={keepwarm.KEEPWARM_HEADER: '1'}).get_environ()
+        started = time.perf_counter()
+        try:
+            _, status, _ = run_wsgi_app(info['wsgi'].wsgi_app, environ, buffered=True)
+            status = int(status.split()[0])
+        except Exception as e:
+            status = type(e).__name__
+        touched.append((name, time.perf_counter() - started, status))
+    return touched
+
+def unmount_api(file_name):
+    """Removes a hosted API from the dispatcher; returns its info, None if it wasn't hosted."""
+    with hosted_apis_lock:
+        info = hosted_apis.pop(file_name, None)
+        if info is not None:
+            update_middleware()
+    return info
+
+def drop_modules_under(directory):
+    """Removes and returns the sys.modules entries whose file lives under `directory`."""
+    prefix = directory + os.sep
+    dropped = {}
+    for name, mod in list(sys.modules.items()):
+        if (getattr(mod, '__file__', None) or '').startswith(prefix):
+            dropped[name] = sys.modules.pop(name)
+    return dropped
+
+def load_api_module(file_path, user_id, project_dir=None, env=None):
+    """
+    Imports an API file under a unique module name and returns (module_name, module).
+
+    A project's directory is on sys.path only while its entry point runs, and
+    sys.modules entries named like its top-level modules are set aside meanwhile,
+    so two projects that both ship a utils.py each import their own. The project's
+    modules are then taken back out of sys.modules (the app keeps its references):
+    project helpers must be imported at the top level, not lazily at request time.
+
+    With venvs the `env` site-packages comes first on sys.path while the file's top
+    level runs, then stays at the end of it while the API is hosted so imports
+    deferred to request time still resolve. Third-party packages share one module
+    namespace across hosted APIs: a package already imported by the bot or by
+    another API is reused, whatever env it came from.
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    module_name = f"api_module_{user_id}_{stem}_{next(api_module_counter)}"
+    site_dir = None
+    if VENVS_ENABLED:
+        # Modules the bot already imported (flask, werkzeug...) stay shared
+        site_dir = venvs.env_site_packages(env or upload_env(project_dir, user_id))
+        if not os.path.isdir(site_dir):
+            site_dir = None
+    # A project file named like a stdlib module must not displace it for the whole bot
+    own_names = projects.top_level_names(project_dir) - set(sys.stdlib_module_names) if project_dir else set()
+    spec = importlib.util.spec_from_file_location(module_name, file_path)
+    module = importlib.util.module_from_spec(spec)
+    # sys.path and sys.modules are process-wide: one API import at a time
+    with api_import_lock:
+        stashed = {name: sys.modules.pop(name) for name in list(sys.modules) if name.partition('.')[0] in own_names}
+        search_dirs = [d for d in (site_dir, project_dir) if d]
+        for directory in search_dirs:
+            sys.path.insert(0, directory)  # The project ends up first, ahead of its env
+        sys.modules[module_name] = module
+        try:
+            bytecode_cache.exec_module(module, file_path)
+        except BaseException:
+            sys.modules.pop(module_name, None)
+            raise
+        finally:
+            for directory in search_dirs:
+                sys.path.remove(directory)
+            if project_dir:
+                for name in list(sys.modules):
+                    if name.partition('.')[0] in own_names:
+                        sys.modules.pop(name)
+                drop_modules_under(project_dir)
+                sys.modules.update(stashed)
+        sys.modules[module_name] = module
+        if site_dir:
+            api_site_dirs[module_name] = site_dir
+            if site_dir not in sys.path:
+                sys.path.append(site_dir)
+    return module_name, module
+
+def check_api_ready(module):
+    # Optional readiness check: the API file may define READINESS_PATH = "/health"
+    path = getattr(module, 'READINESS_PATH', None)
+    if not path:
+        return True, ""
+    response = module.app.test_client().get(path)
+    return response.status_code < 400, f"{path} returned {response.status_code}"
+
+def retire_api(info):
+    """Waits for in-flight requests on a replaced/stopped API, then releases its module."""
+    def drain():
+        deadline = time.time() + API_DRAIN_TIMEOUT
+        while info['wsgi'].in_flight > 0 and time.time() < deadline:
+            time.sleep(0.1)
+        sys.modules.pop(info.get('module'), None)
+        with api_import_lock:
+            site_dir = api_site_dirs.pop(info.get('module'), None)
+            if site_dir in sys.path and site_dir not in api_site_dirs.values():
+                sys.path.remove(site_dir)
+        gc.collect()
+    threading.Thread(target=drain, daemon=True).start()
+
+def reload_hosted_api(file_name, chat_id, user_id):
+    """Zero-downtime reload: import the new version next to the old one, then swap the route."""
+    old_info = hosted_apis.get(file_name)
+    if old_info is None:
+        return
+    try:
+        file_path, project_dir = resolve_upload(file_name)
+        if file_path is None:
+            bot.send_message(chat_id, f"⚠️ *Reload skipped:* no entry point in `{file_name}`\nThe previous version keeps serving.", parse_mode='Markdown')
+            return
+        if project_dir is None:
+            check_and_install_requirements(file_path, upload_owner(file_name, old_info['user_id']))
+        module_name, module = load_api_module(file_path, old_info['user_id'], project_dir, upload_env(project_dir, upload_owner(file_name, old_info['user_id'])))
+        if not hasattr(module, 'app'):
+            sys.modules.pop(module_name, None)
+            bot.send_message(chat_id, f"⚠️ *Reload skipped:* no `app` in `{file_name}`\nThe previous version keeps serving.", parse_mode='Markdown')
+            return
+
+        ready, detail = check_api_ready(module)
+        if not ready:
+            sys.modules.pop(module_name, None)
+            bot.send_message(chat_id, f"⚠️ *Reload failed readiness check:* `{detail}`\nThe previous version keeps serving.", parse_mode='Markdown')
+            return
+
+        new_info = {
+            'app': module.app,
+            'path': old_info['path'],
+            'user_id': old_info['user_id'],
+            'module': module_name,
+            'project_dir': project_dir,
+            'wsgi': TrackedApp(module.app.wsgi_app, old_info['user_id'])
+        }
+        # Compare-and-swap: only replace the version this reload started from
+        with hosted_apis_lock:
+            swapped = hosted_apis.get(file_name) is old_info
+            if swapped:
+                hosted_apis[file_name] = new_info
+                update_middleware()
+        if not swapped:
+            # Stopped, deleted or reloaded by someone else while we imported
+            retire_api(new_info)
+            bot.send_message(chat_id, f"⚠️ *Reload discarded:* `{file_name}` was stopped or reloaded meanwhile", parse_mode='Markdown')
+            return
+        retire_api(old_info)
+
+        bot.send_message(chat_id, f"♻️ *API Reloaded:* `{file_name}`\n🔗 `{old_info['path']}`", parse_mode='Markdown')
+        log_action(user_id, f"Reloaded API: {file_name}")
+    except Exception as e:
+        bot.send_message(chat_id, f"⚠️ *Reload failed:* `{str(e)}`\nThe previous version keeps serving.", parse_mode='Markdown')
+        log_action(user_id, f"Reload API Error: {str(e)}")
 
 # --- Keyboards ---
 
@@ -139,12 +503,16 @@ def create_transparent_keyboard():
         types.KeyboardButton('ℹ️ Status'),
         types.KeyboardButton('🌐 Ping'),
     )
+    keyboard.add(
+        types.KeyboardButton('⏰ Schedule'),
+        types.KeyboardButton('🔗 Publish'),
+    )
     return keyboard
 
 def create_file_selection_keyboard(file_list, prefix="", row_width=2):
     keyboard = types.InlineKeyboardMarkup(row_width=row_width)
     for file_name in file_list:
-        icon = '🐍' if file_name.endswith('.py') else '📄'
+        icon = '🐍' if file_name.endswith('.py') else '🗂️' if file_name.endswith('/') else '📄'
         keyboard.add(
             types.InlineKeyboardButton(text=f"{icon} {file_name}", callback_data=f"{prefix}_{file_name}")
         )
@@ -153,6 +521,7 @@ def create_file_selection_keyboard(file_list, prefix="", row_width=2):
 
 def get_file_icon(filename):
     if filename.endswith('.py'): return '🐍'
+    elif filename.endswith('/'): return '🗂️'
     elif filename.endswith('.txt'): return '📄'
     elif filename.endswith('.json'): return '📋'
     elif filename.endswith('.log'): return '📊'
@@ -166,13 +535,15 @@ def send_welcome(message):
 🤖 *Bot Management System (Render Edition)*
     
 *Commands:*
-📤 Upload - Upload files
+📤 Upload - Upload files (.py, or .zip/.tar.gz projects)
 📂 Files - List uploaded files
 ⚡ Run - Execute Python files (Script Mode)
 🌐 Host API - Host Flask API files (Web Mode)
 📱 Manage APIs - Stop/Manage Hosted APIs
 🗑️ Delete - Remove files
 ⏹️ Stop Script - Stop running python scripts
+⏰ Schedule - Run scripts on a timer (cron or interval)
+🔗 Publish - Share an uploaded file at a public URL
 🧹 Clear All - Remove all files
 📦 Install - Install Python packages
 📊 Logs - View system logs
@@ -181,21 +552,94 @@ def send_welcome(message):
     bot.send_message(message.chat.id, welcome_msg, parse_mode='Markdown', reply_markup=create_transparent_keyboard())
     log_action(message.from_user.id, "Started bot")
 
-@bot.message_handler(func=lambda message: message.text == "📤 Upload")
+@router.text("📤 Upload")
 def handle_upload_request(message):
     bot.reply_to(message, "📎 *Send me the file you want to upload*", parse_mode='Markdown')
 
+def handle_project_upload(message, downloaded_file):
+    name = projects.project_name(message.document.file_name)
+    if not name or name.startswith('.'):
+        return bot.reply_to(message, "❌ Invalid project name", parse_mode='Markdown')
+
+    def validate(root):
+        size, count = quotas.path_usage(root)
+        error = quota_store.check_upload(message.from_user.id, f"{name}/", size, count)
+        if error:
+            raise projects.ProjectError(error)
+        for py_file in projects.iter_python_files(root):
+            try:
+                with open(py_file, 'rb') as f:
+                    compile(f.read(), py_file, 'exec', dont_inherit=True)
+            except SyntaxError as e:
+                rel = os.path.relpath(py_file, root)
+                raise projects.ProjectError(f"Syntax error in {rel}, line {e.lineno}, column {e.offset}: {e.msg}")
+
+    suffix = '.zip' if message.document.file_name.lower().endswith('.zip') else '.tar.gz'
+    with tempfile.NamedTemporaryFile(suffix=suffix, dir=UPLOAD_DIR, prefix='.upload-') as tmp:
+        tmp.write(downloaded_file)
+        tmp.flush()
+        try:
+            project_dir, budget = projects.extract_project(
+                tmp.name, UPLOAD_DIR, name, validate,
+                max_bytes=quota_store.remaining_bytes(message.from_user.id, f"{name}/")
+            )
+        except projects.ProjectError as e:
+            return bot.reply_to(message, f"❌ *Project rejected:* `{str(e)}`", parse_mode='Markdown')
+    quota_store.record_upload(message.from_user.id, f"{name}/", *quotas.path_usage(project_dir))
+
+    # Warm the bytecode cache at the final paths
+    for py_file in projects.iter_python_files(project_dir):
+        bytecode_cache.load_code(py_file)
+
+    msg = f"✅ *Project uploaded:* `{name}/`\n📦 Files: `{budget.entries}` ({budget.bytes // 1024} KB)"
+    entry = projects.find_entry_point(project_dir)
+    msg += f"\n▶️ Entry point: `{os.path.relpath(entry, project_dir)}`" if entry else "\n⚠️ No entry point found (add main.py or app.py)"
+
+    req_path = os.path.join(project_dir, 'requirements.txt')
+    if os.path.exists(req_path):
+        try:
+            install_requirements_file(req_path, upload_env(project_dir))
+            msg += "\n📦 Installed requirements.txt"
+        except Exception as e:
+            msg += f"\n⚠️ requirements.txt failed: `{str(e)[-300:]}`"
+
+    bot.reply_to(message, msg, parse_mode='Markdown')
+    log_action(message.from_user.id, f"Uploaded project: {name}")
+
+    if f"{name}/" in hosted_apis:
+        threading.Thread(target=reload_hosted_api, args=(f"{name}/", message.chat.id, message.from_user.id), daemon=True).start()
+
 @bot.message_handler(content_types=['document'])
 def handle_document(message):
     try:
         file_info = bot.get_file(message.document.file_id)
         downloaded_file = bot.download_file(file_info.file_path)
+        if projects.is_archive(message.document.file_name):
+            return handle_project_upload(message, downloaded_file)
         file_name = os.path.join(UPLOAD_DIR, message.document.file_name)
+
+        quota_error = quota_store.check_upload(message.from_user.id, message.document.file_name, len(downloaded_file))
+        if quota_error:
+            return bot.reply_to(message, f"❌ *Upload rejected:* {quota_error}", parse_mode='Markdown')
+
+        # Compile once at upload time: rejects broken files and warms the bytecode cache
+        if file_name.endswith('.py'):
+            try:
+                bytecode_cache.load_code(file_name, downloaded_file)
+            except SyntaxError as e:
+                bot.reply_to(message, f"❌ *Syntax error in* `{message.document.file_name}`\n\n📍 Line `{e.lineno}`, column `{e.offset}`: `{e.msg}`", parse_mode='Markdown')
+                log_action(message.from_user.id, f"Rejected upload (syntax error): {message.document.file_name}")
+                return
+            except ValueError as e:
+                bot.reply_to(message, f"❌ *Invalid Python file:* `{str(e)}`", parse_mode='Markdown')
+                return
+
         with open(file_name, 'wb') as f:
             f.write(downloaded_file)
+        quota_store.record_upload(message.from_user.id, message.document.file_name, len(downloaded_file))
 
         if file_name.endswith('.py'):
-            installed = check_and_install_requirements(file_name)
+            installed = check_and_install_requirements(file_name, message.from_user.id)
             msg = f"✅ *File uploaded:* `{message.document.file_name}`"
             if installed: msg += f"\n📦 Auto-installed: {', '.join(installed)}"
             bot.reply_to(message, msg, parse_mode='Markdown')
@@ -203,41 +647,70 @@ def handle_document(message):
             bot.reply_to(message, f"✅ *File uploaded:* `{message.document.file_name}`", parse_mode='Markdown')
         
         log_action(message.from_user.id, f"Uploaded: {message.document.file_name}")
+
+        # Re-upload of a published file: rebuild its compressed variants
+        if static_registry.owner(message.document.file_name) is not None:
+            static_app.warm(file_name)
+
+        # Re-upload of a hosted API: swap it in the background without unmounting
+        if message.document.file_name in hosted_apis:
+            threading.Thread(
+                target=reload_hosted_api,
+                args=(message.document.file_name, message.chat.id, message.from_user.id),
+                daemon=True
+            ).start()
     except Exception as e:
         bot.reply_to(message, f"❌ Error: `{str(e)}`", parse_mode='Markdown')
 
-@bot.message_handler(func=lambda message: message.text == "📂 Files")
+@router.text("📂 Files")
 def list_files(message):
-    files = os.listdir(UPLOAD_DIR)
+    files = list_uploads()
     if files:
         file_list = "\n".join([f"{get_file_icon(f)} `{f}`" for f in files])
         bot.send_message(message.chat.id, f"📁 *Files:*\n\n{file_list}", parse_mode='Markdown')
     else:
         bot.reply_to(message, "📭 No files found", parse_mode='Markdown')
 
-@bot.message_handler(func=lambda message: message.text == "⚡ Run")
+@router.text("⚡ Run")
 def handle_run_file_request(message):
-    files = os.listdir(UPLOAD_DIR)
+    files = list_uploads()
     if not files: return bot.reply_to(message, "📭 No files", parse_mode='Markdown')
     bot.send_message(message.chat.id, "⚡ *Select script to run:*", parse_mode='Markdown', reply_markup=create_file_selection_keyboard(files, "run"))
 
-def run_file_in_thread(file_path, file_name, chat_id):
+def run_file_in_thread(file_path, file_name, chat_id, cwd=None, user_id=None):
+    # user_id: owner whose script slot was reserved with quota_store.acquire_script
+    started = False
     try:
-        if file_path.endswith('.py'):
-            check_and_install_requirements(file_path)
+        # Projects install from requirements.txt at upload; scanning their imports would pip-install local modules
+        owner = upload_owner(file_name, user_id)
+        if file_path.endswith('.py') and cwd is None:
+            check_and_install_requirements(file_path, owner)
         
         bot.send_message(chat_id, f"🚀 *Started Execution:* `{file_name}`\n\n⏳ Processing...", parse_mode='Markdown')
         
-        process = subprocess.Popen(
-            ['python', file_path], 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
+        python = venvs.ensure_env(upload_env(cwd, owner)) if VENVS_ENABLED else 'python'
+        process = None
+        if fork_server is not None and file_path.endswith('.py'):
+            try:
+                process = fork_server.spawn(file_path, cwd=cwd)
+            except Exception as e:
+                logger.error(f"Fork server spawn failed, falling back to Popen: {e}")
+        if process is None:
+            cmd = [python, bytecode_cache.RUNNER, file_path] if file_path.endswith('.py') else [python, file_path]
+            process = subprocess.Popen(
+                cmd, 
+                stdout=subprocess.PIPE, 
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                universal_newlines=True,
+                cwd=cwd
+            )
         
-        active_processes[file_name] = {'process': process, 'start_time': datetime.now(), 'chat_id': chat_id}
+        active_processes[file_name] = {'process': process, 'start_time': datetime.now(), 'chat_id': chat_id, 'user_id': user_id}
+        if user_id is not None:
+            quota_store.activate_script(user_id)
+        started = True
         output_lines = []
         error_lines = []
         
@@ -266,19 +739,22 @@ def run_file_in_thread(file_path, file_name, chat_id):
     except Exception as e:
         bot.send_message(chat_id, f"❌ Error: `{str(e)}`", parse_mode='Markdown')
         if file_name in active_processes: del active_processes[file_name]
+    finally:
+        if user_id is not None:
+            quota_store.release_script(user_id, pending=not started)
 
 # --- Host API Logic ---
 
-@bot.message_handler(func=lambda message: message.text == "🌐 Host API")
+@router.text("🌐 Host API")
 def handle_host_request(message):
-    files = [f for f in os.listdir(UPLOAD_DIR) if f.endswith('.py')]
-    if not files: return bot.reply_to(message, "📭 No .py files to host", parse_mode='Markdown')
+    files = [f for f in list_uploads() if f.endswith('.py') or f.endswith('/')]
+    if not files: return bot.reply_to(message, "📭 No .py files or projects to host", parse_mode='Markdown')
     bot.send_message(message.chat.id, "🌐 *Select file to Host as API:*", parse_mode='Markdown', reply_markup=create_file_selection_keyboard(files, "host"))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('host_'))
+@router.callback("host_")
 def host_api_callback(call):
     file_name = call.data[5:]
-    file_path = os.path.join(UPLOAD_DIR, file_name)
+    file_path, project_dir = resolve_upload(file_name)
     user_prefix = f"/u{call.from_user.id}"
     
     # Check if already hosted
@@ -286,32 +762,44 @@ def host_api_callback(call):
         bot.answer_callback_query(call.id, "⚠️ Already hosted!")
         return
 
+    if file_path is None:
+        return bot.answer_callback_query(call.id, "❌ No entry point (main.py/app.py) in project!")
+
+    quota_error = quota_store.acquire_api(call.from_user.id)
+    if quota_error:
+        return bot.answer_callback_query(call.id, f"❌ {quota_error}")
+
+    hosted = False
     try:
-        check_and_install_requirements(file_path)
+        owner = upload_owner(file_name, call.from_user.id)
+        if project_dir is None:
+            check_and_install_requirements(file_path, owner)
         
-        spec = importlib.util.spec_from_file_location(f"api_module_{call.from_user.id}", file_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        module_name, module = load_api_module(file_path, call.from_user.id, project_dir, upload_env(project_dir, owner))
         
         if not hasattr(module, 'app'):
+            sys.modules.pop(module_name, None)
             bot.answer_callback_query(call.id, "❌ No 'app' variable found in file!")
             return
             
         user_app = module.app
-        mount_path = f"{user_prefix}/{file_name.replace('.py', '')}"
-        
-        # Store in global dict
-        hosted_apis[file_name] = {
-            'app': user_app,
-            'path': mount_path,
-            'user_id': call.from_user.id
-        }
+        mount_path = f"{user_prefix}/{upload_stem(file_name)}"
         
-        # Update Flask Middleware
-        update_middleware()
+        # Store in global dict and update Flask Middleware
+        with hosted_apis_lock:
+            hosted_apis[file_name] = {
+                'app': user_app,
+                'path': mount_path,
+                'user_id': call.from_user.id,
+                'module': module_name,
+                'project_dir': project_dir,
+                'wsgi': TrackedApp(user_app.wsgi_app, call.from_user.id)
+            }
+            update_middleware()
+        quota_store.activate_api(call.from_user.id)
+        hosted = True
         
-        base_url = f"https://{RENDER_EXTERNAL_URL}" if "render" in RENDER_EXTERNAL_URL else f"http://{RENDER_EXTERNAL_URL}"
-        full_url = f"{base_url}{mount_path}/"
+        full_url = f"{public_base_url()}{mount_path}/"
         
         bot.edit_message_text(
             f"🌐 *API Hosted Successfully!*\n\n🔗 *URL:* `{full_url}`\n\n📁 File: `{file_name}`\n👤 User: `{call.from_user.id}`",
@@ -323,10 +811,13 @@ def host_api_callback(call):
         error_trace = traceback.format_exc()
         bot.edit_message_text(f"❌ *Hosting Failed:* `{str(e)}`", call.message.chat.id, call.message.message_id, parse_mode='Markdown')
         log_action(call.from_user.id, f"Host API Error: {str(e)}")
+    finally:
+        if not hosted:
+            quota_store.release_api(call.from_user.id, pending=True)
 
 # --- Manage APIs Logic ---
 
-@bot.message_handler(func=lambda message: message.text == "📱 Manage APIs")
+@router.text("📱 Manage APIs")
 def manage_apis(message):
     if not hosted_apis:
         return bot.reply_to(message, "📭 *No APIs currently hosted*", parse_mode='Markdown')
@@ -347,23 +838,25 @@ def manage_apis(message):
     keyboard.add(types.InlineKeyboardButton(text="🔙 Back", callback_data="back_to_main"))
     bot.send_message(message.chat.id, msg, parse_mode='Markdown', reply_markup=keyboard)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('stop_api_'))
+@router.callback("stop_api_")
 def stop_api_callback(call):
     file_name = call.data[9:]
     
-    if file_name not in hosted_apis:
+    api_info = hosted_apis.get(file_name)
+    if api_info is None:
         return bot.answer_callback_query(call.id, "❌ API not found")
     
     # Check permission
-    api_info = hosted_apis[file_name]
     if api_info['user_id'] != call.from_user.id and call.from_user.id != ADMIN_ID:
         return bot.answer_callback_query(call.id, "❌ You don't own this API")
     
     try:
-        # Remove from dictionary
-        del hosted_apis[file_name]
-        # Update Middleware (Unmount)
-        update_middleware()
+        # Remove from dictionary and unmount
+        api_info = unmount_api(file_name)
+        if api_info is None:
+            return bot.answer_callback_query(call.id, "❌ API not found")
+        retire_api(api_info)
+        quota_store.release_api(api_info['user_id'])
         
         bot.answer_callback_query(call.id, "✅ API Stopped")
         bot.edit_message_text(
@@ -378,41 +871,57 @@ def stop_api_callback(call):
 
 # --- Run / Delete / Stop Scripts ---
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('run_'))
+@router.callback("run_")
 def run_file_callback(call):
     file_name = call.data[4:]
     if file_name in active_processes:
         return bot.answer_callback_query(call.id, "⚠️ Already running!")
     
+    file_path, project_dir = resolve_upload(file_name)
+    if file_path is None:
+        return bot.answer_callback_query(call.id, "❌ No entry point (main.py/app.py) in project!")
+    if project_dir:
+        file_path = os.path.abspath(file_path)
+
     # Warning for Flask files
-    file_path = os.path.join(UPLOAD_DIR, file_name)
     try:
         with open(file_path, 'r') as f: content = f.read()
         if "Flask(__name__)" in content and "app.run" in content:
             bot.answer_callback_query(call.id, "⚠️ Warning: Use 'Host API' for Flask apps.")
     except: pass
 
-    bot.answer_callback_query(call.id, "⚡ Starting...")
-    thread = threading.Thread(target=run_file_in_thread, args=(file_path, file_name, call.message.chat.id))
-    thread.daemon = True
-    thread.start()
+    quota_error = quota_store.acquire_script(call.from_user.id)
+    if quota_error:
+        return bot.answer_callback_query(call.id, f"❌ {quota_error}")
+
+    # Until the thread starts (and owns the slot), a failure here must give it back
+    try:
+        bot.answer_callback_query(call.id, "⚡ Starting...")
+        thread = threading.Thread(target=run_file_in_thread, args=(file_path, file_name, call.message.chat.id, project_dir, call.from_user.id))
+        thread.daemon = True
+        thread.start()
+    except BaseException:
+        quota_store.release_script(call.from_user.id, pending=True)
+        raise
     bot.edit_message_text(f"⚡ *Running:* `{file_name}`", call.message.chat.id, call.message.message_id, parse_mode='Markdown')
 
-@bot.message_handler(func=lambda message: message.text == "🗑️ Delete")
+@router.text("🗑️ Delete")
 def handle_delete_request(message):
-    files = os.listdir(UPLOAD_DIR)
+    files = list_uploads()
     if not files: return bot.reply_to(message, "📭 No files", parse_mode='Markdown')
     bot.send_message(message.chat.id, "🗑️ *Select file to delete:*", parse_mode='Markdown', reply_markup=create_file_selection_keyboard(files, "delete"))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('delete_'))
+@router.callback("delete_")
 def delete_file_callback(call):
     file_name = call.data[7:]
     try:
-        os.remove(os.path.join(UPLOAD_DIR, file_name))
+        remove_upload(file_name)
+        job_scheduler.remove_file(file_name)
         # If this file is being hosted as an API, stop it too
-        if file_name in hosted_apis:
-            del hosted_apis[file_name]
-            update_middleware()
+        api_info = unmount_api(file_name)
+        if api_info is not None:
+            retire_api(api_info)
+            quota_store.release_api(api_info['user_id'])
             
         bot.answer_callback_query(call.id, "✅ Deleted!")
         bot.edit_message_text(f"🗑️ Deleted: `{file_name}`", call.message.chat.id, call.message.message_id, parse_mode='Markdown')
@@ -420,7 +929,7 @@ def delete_file_callback(call):
     except Exception as e:
         bot.answer_callback_query(call.id, "❌ Error")
 
-@bot.message_handler(func=lambda message: message.text == "⏹️ Stop Script")
+@router.text("⏹️ Stop Script")
 def stop_file(message):
     if not active_processes: return bot.reply_to(message, "⏹️ No active processes", parse_mode='Markdown')
     
@@ -430,7 +939,7 @@ def stop_file(message):
     
     bot.reply_to(message, "🛑 *Select script to stop:*", parse_mode='Markdown', reply_markup=keyboard)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("stop_proc_"))
+@router.callback("stop_proc_")
 def stop_proc_callback(call):
     file_name = call.data[10:]
     if file_name in active_processes:
@@ -442,7 +951,7 @@ def stop_proc_callback(call):
             log_action(call.from_user.id, f"Stopped Script: {file_name}")
         except: pass
 
-@bot.message_handler(func=lambda message: message.text == "🧹 Clear All")
+@router.text("🧹 Clear All")
 def delete_all_files(message):
     keyboard = types.InlineKeyboardMarkup()
     keyboard.add(
@@ -451,84 +960,280 @@ def delete_all_files(message):
     )
     bot.reply_to(message, "⚠️ *Warning:* This will delete ALL files & Stop ALL APIs!", parse_mode='Markdown', reply_markup=keyboard)
 
-@bot.callback_query_handler(func=lambda call: call.data == "confirm_delete_all")
+@router.callback("confirm_delete_all", exact=True)
 def confirm_delete_all_callback(call):
     try:
-        for f in os.listdir(UPLOAD_DIR):
-            os.remove(os.path.join(UPLOAD_DIR, f))
+        for f in list_uploads():
+            remove_upload(f)
+            job_scheduler.remove_file(f)
         # Stop all APIs
-        hosted_apis.clear()
-        update_middleware()
+        with hosted_apis_lock:
+            retired = list(hosted_apis.values())
+            hosted_apis.clear()
+            update_middleware()
+        for info in retired:
+            retire_api(info)
+            quota_store.release_api(info['user_id'])
         
         bot.answer_callback_query(call.id, "✅ Cleared!")
         bot.edit_message_text("🧹 *All files and APIs cleared!*", call.message.chat.id, call.message.message_id, parse_mode='Markdown')
     except Exception as e:
         bot.answer_callback_query(call.id, "❌ Error")
 
+# --- Scheduled Runs ---
+
+def run_scheduled_job(job):
+    # Called on the scheduler's worker thread; blocks until the run finishes
+    file_name = job['file_name']
+    if file_name in active_processes:
+        log_action(job['user_id'], f"Scheduled run skipped (still running): {file_name}")
+        return
+    file_path, project_dir = resolve_upload(file_name)
+    if file_path is None or not os.path.exists(file_path):
+        log_action(job['user_id'], f"Scheduled run skipped (file missing): {file_name}")
+        return
+    if project_dir:
+        file_path = os.path.abspath(file_path)
+    log_action(job['user_id'], f"Scheduled run: {file_name} ({job['spec']})")
+    quota_error = quota_store.acquire_script(job['user_id'])
+    if quota_error:
+        log_action(job['user_id'], f"Scheduled run skipped ({quota_error}): {file_name}")
+        return
+    # The slot goes straight to run_file_in_thread, which releases it whatever happens
+    run_file_in_thread(file_path, file_name, job['chat_id'], project_dir, job['user_id'])
+
+job_scheduler = Scheduler(os.path.join(DATA_DIR, 'schedules.json'), run_scheduled_job)
+
+@router.text("⏰ Schedule")
+def handle_schedule_request(message):
+    jobs = job_scheduler.jobs_for(None if message.from_user.id == ADMIN_ID else message.from_user.id)
+    if jobs:
+        msg = "⏰ *Scheduled Runs:*\n\n"
+        keyboard = types.InlineKeyboardMarkup(row_width=1)
+        for job in jobs:
+            next_run = datetime.fromtimestamp(job['next_run']).strftime("%Y-%m-%d %H:%M")
+            msg += f"{get_file_icon(job['file_name'])} `{job['file_name']}` — `{job['spec']}`\n   ⏭ Next: `{next_run}`\n\n"
+            keyboard.add(types.InlineKeyboardButton(text=f"🗑️ Unschedule {job['file_name']} ({job['id']})", callback_data=f"unsched_{job['id']}"))
+        bot.send_message(message.chat.id, msg, parse_mode='Markdown', reply_markup=keyboard)
+
+    files = [f for f in list_uploads() if f.endswith('.py') or f.endswith('/')]
+    if not files: return bot.reply_to(message, "📭 No scripts to schedule", parse_mode='Markdown')
+    bot.send_message(message.chat.id, "⏰ *Select script to schedule:*", parse_mode='Markdown', reply_markup=create_file_selection_keyboard(files, "sched"))
+
+@router.callback("sched_")
+def schedule_file_callback(call):
+    file_name = call.data[6:]
+    bot.answer_callback_query(call.id)
+    bot.edit_message_text(
+        f"⏰ *Schedule* `{file_name}`\n\nSend the schedule:\n`every 30m` / `every 2h`\nor cron `*/15 * * * *` (min hour day month weekday)\n\nOptional: `jitter=60` `missed=run`",
+        call.message.chat.id, call.message.message_id, parse_mode='Markdown'
+    )
+    bot.register_next_step_handler_by_chat_id(call.message.chat.id, process_schedule, file_name)
+
+def process_schedule(message, file_name):
+    try:
+        job = job_scheduler.add(file_name, message.chat.id, message.from_user.id, message.text or "")
+    except (ScheduleError, ValueError) as e:
+        return bot.reply_to(message, f"❌ *Invalid schedule:* `{str(e)}`", parse_mode='Markdown')
+    next_run = datetime.fromtimestamp(job['next_run']).strftime("%Y-%m-%d %H:%M")
+    bot.reply_to(message, f"⏰ *Scheduled:* `{file_name}`\n🔁 `{job['spec']}`\n⏭ Next run: `{next_run}`", parse_mode='Markdown')
+    log_action(message.from_user.id, f"Scheduled: {file_name} ({job['spec']})")
+
+@router.callback("unsched_")
+def unschedule_callback(call):
+    job_id = call.data[8:]
+    job = job_scheduler.jobs.get(job_id)
+    if job is None:
+        return bot.answer_callback_query(call.id, "❌ Schedule not found")
+    if job['user_id'] != call.from_user.id and call.from_user.id != ADMIN_ID:
+        return bot.answer_callback_query(call.id, "❌ You don't own this schedule")
+    job_scheduler.remove(job_id)
+    bot.answer_callback_query(call.id, "✅ Unscheduled")
+    bot.edit_message_text(f"🗑️ Unscheduled: `{job['file_name']}` (`{job['spec']}`)", call.message.chat.id, call.message.message_id, parse_mode='Markdown')
+    log_action(call.from_user.id, f"Unscheduled: {job['file_name']}")
+
+# --- Published Files ---
+
+@router.text("🔗 Publish")
+def handle_publish_request(message):
+    files = [f for f in list_uploads() if not f.endswith('/')]
+    if not files: return bot.reply_to(message, "📭 No files to publish", parse_mode='Markdown')
+    msg = "🔗 *Select file to publish / unpublish:*"
+    published = [
+        f"🟢 `{name}`" for name, user_id in static_registry.published.items()
+        if user_id == message.from_user.id or message.from_user.id == ADMIN_ID
+    ]
+    if published:
+        msg = "🔗 *Published:*\n" + "\n".join(published) + "\n\n" + msg
+    bot.send_message(message.chat.id, msg, parse_mode='Markdown', reply_markup=create_file_selection_keyboard(files, "pub"))
+
+@router.callback("pub_")
+def publish_file_callback(call):
+    file_name = call.data[4:]
+    file_path = os.path.join(UPLOAD_DIR, file_name)
+    if not os.path.isfile(file_path):
+        return bot.answer_callback_query(call.id, "❌ File not found")
+    owner = quota_store.owner(file_name)
+    # Files that predate quotas have no owner: only the admin may expose them
+    if owner != call.from_user.id and call.from_user.id != ADMIN_ID:
+        return bot.answer_callback_query(call.id, "❌ You don't own this file" if owner is not None else "❌ Admin only for files without an owner")
+
+    if static_registry.owner(file_name) is not None:
+        static_registry.unpublish(file_name)
+        static_app.forget(file_name)
+        bot.answer_callback_query(call.id, "✅ Unpublished")
+        bot.edit_message_text(f"🔒 *Unpublished:* `{file_name}`", call.message.chat.id, call.message.message_id, parse_mode='Markdown')
+        log_action(call.from_user.id, f"Unpublished: {file_name}")
+        return
+
+    path = static_registry.publish(file_name, owner if owner is not None else call.from_user.id)
+    static_app.warm(file_path)
+    bot.answer_callback_query(call.id, "✅ Published")
+    bot.edit_message_text(
+        f"🔗 *Published:* `{file_name}`\n\n🌍 *URL:* `{public_base_url()}{quote(path)}`\n\nPress 🔗 Publish again to unpublish.",
+        call.message.chat.id, call.message.message_id, parse_mode='Markdown'
+    )
+    log_action(call.from_user.id, f"Published: {file_name} at {path}")
+
 # --- Install Package ---
 
-@bot.message_handler(func=lambda message: message.text == "📦 Install")
+@router.text("📦 Install")
 def handle_install_package(message):
-    bot.reply_to(message, "📦 *Enter package name:*\n\nExample: `requests` or `numpy pandas`", parse_mode='Markdown')
+    bot.reply_to(message, "📦 *Enter package name:*\n\nExample: `requests` or `numpy pandas`\nFor a project: `myproject: numpy pandas`", parse_mode='Markdown')
     bot.register_next_step_handler(message, process_package_installation)
 
+def split_install_target(text):
+    """`myproject: numpy pandas` -> ('myproject', 'numpy pandas'); anything else is all packages."""
+    # Requirements contain colons too (pkg @ https://..., git+https://...)
+    match = re.match(r'^([\w.-]+):\s+', text)
+    if match and os.path.isdir(os.path.join(UPLOAD_DIR, match.group(1))):
+        return match.group(1), text[match.end():].strip()
+    return None, text
+
+def install_steps(project, packages, user_id=None):
+    """(steps, cleanup) for pip_progress.PipRun."""
+    if VENVS_ENABLED:
+        return venvs.install_steps(venvs.env_name(project, user_id), packages)
+    return [(lambda: [sys.executable, "-m", "pip", "install"] + packages, None)], None
+
+def install_cancel_keyboard(install_id):
+    keyboard = types.InlineKeyboardMarkup()
+    keyboard.add(types.InlineKeyboardButton("✖️ Cancel", callback_data=f"pipcancel_{install_id}"))
+    return keyboard
+
+def install_progress_text(package_name, run):
+    text = f"📦 *Installing:* `{package_name}`\n\n{run.phase}"
+    if run.detail:
+        text += f"\n`{run.detail.replace('`', '')}`"
+    return text + f"\n\n⏱️ {time.time() - run.started:.0f}s · {run.lines} lines"
+
+def install_report(package_name, run):
+    if run.cancelled:
+        return f"✖️ *Installation Cancelled:* `{package_name}`"
+    output = "\n".join(run.stdout_tail)
+    if run.ok:
+        response = f"📦 *Installation Complete:* `{package_name}`\n\n"
+        if output: response += f"✅ *Output:*\n```\n{output[-1000:]}\n```\n"
+        if run.warnings: response += f"\n⚠️ {run.warnings} pip warning(s)"
+        return response
+    errors = "\n".join(run.stderr_tail) or output
+    return f"❌ *Installation Failed:* `{package_name}` (exit code {run.returncode})\n\n```\n{errors[-1500:]}\n```"
+
 def process_package_installation(message):
-    package_name = message.text.strip()
+    project, package_name = split_install_target(message.text.strip())
     if not package_name: return bot.reply_to(message, "❌ No package specified", parse_mode='Markdown')
     
-    progress_msg = bot.reply_to(message, f"📦 *Installing:* `{package_name}`\n\n⏳ Please wait...", parse_mode='Markdown')
+    install_id = f"{message.chat.id}_{message.message_id}"
+    progress_msg = bot.reply_to(message, f"📦 *Installing:* `{package_name}`\n\n⏳ Please wait...", parse_mode='Markdown', reply_markup=install_cancel_keyboard(install_id))
+    
+    def show_progress(run):
+        bot.edit_message_text(install_progress_text(package_name, run), message.chat.id, progress_msg.message_id, parse_mode='Markdown', reply_markup=install_cancel_keyboard(install_id))
     
     def install_thread():
+        steps, cleanup = install_steps(project, package_name.split(), message.from_user.id)
+        run = pip_progress.PipRun(steps, show_progress, cleanup=cleanup)
+        active_installs[install_id] = (run, message.from_user.id)
         try:
-            process = subprocess.Popen(
-                [sys.executable, "-m", "pip", "install"] + package_name.split(),
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-            )
-            stdout, stderr = process.communicate()
-            
-            response = f"📦 *Installation Complete:* `{package_name}`\n\n"
-            if stdout: response += f"✅ *Output:*\n```\n{stdout[-1000:]}\n```\n\n"
-            if stderr and "WARNING" not in stderr: response += f"⚠️ *Errors:*\n```\n{stderr[-1000:]}\n```"
-            
-            bot.edit_message_text(response, message.chat.id, progress_msg.message_id, parse_mode='Markdown')
-            for pkg in package_name.split(): installed_packages.add(pkg.split('==')[0].split('>=')[0])
-            log_action(message.from_user.id, f"Installed: {package_name}")
+            run.run()
+            bot.edit_message_text(install_report(package_name, run), message.chat.id, progress_msg.message_id, parse_mode='Markdown')
+            if run.ok and project is None:
+                for pkg in package_name.split(): installed_packages.add(pkg.split('==')[0].split('>=')[0])
+            outcome = "Installed" if run.ok else "Install cancelled" if run.cancelled else f"Install failed ({run.returncode})"
+            log_action(message.from_user.id, f"{outcome}: {package_name}")
         except Exception as e:
             bot.edit_message_text(f"❌ *Error:* `{str(e)}`", message.chat.id, progress_msg.message_id, parse_mode='Markdown')
+        finally:
+            active_installs.pop(install_id, None)
     
     threading.Thread(target=install_thread, daemon=True).start()
 
-# --- Speedtest / Ping ---
+@router.callback("pipcancel_")
+def cancel_install_callback(call):
+    entry = active_installs.get(call.data[len("pipcancel_"):])
+    if entry is None:
+        return bot.answer_callback_query(call.id, "⚪ Installation already finished")
+    run, user_id = entry
+    if call.from_user.id not in (user_id, ADMIN_ID):
+        return bot.answer_callback_query(call.id, "❌ Not your installation")
+    run.cancel()
+    bot.answer_callback_query(call.id, "✖️ Cancelling...")
+
+# --- Diagnostics / Ping ---
+
+def format_latency(summary):
+    if summary is None:
+        return "no samples yet"
+    return f"p50 {summary['p50_ms']:.1f}ms · p95 {summary['p95_ms']:.1f}ms · max {summary['max_ms']:.1f}ms ({summary['count']})"
 
-@bot.message_handler(func=lambda message: message.text == "🌐 Ping")
+@router.text("🌐 Ping")
 def ping_check(message):
-    progress_msg = bot.reply_to(message, "🌐 *Checking internet speed...*", parse_mode='Markdown')
-    
-    def speedtest_thread():
-        try:
-            import speedtest
-            st = speedtest.Speedtest()
-            st.get_best_server()
-            download = st.download() / 1_000_000
-            upload = st.upload() / 1_000_000
-            ping = st.results.ping
-            result = f"🌐 *Speed Test*\n📡 Download: `{download:.2f} Mbps`\n📤 Upload: `{upload:.2f} Mbps`\n🏓 Ping: `{ping:.0f} ms`"
-            bot.edit_message_text(result, message.chat.id, progress_msg.message_id, parse_mode='Markdown')
-        except ImportError:
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", "speedtest-cli"])
-                # Retry
-                ping_check(message)
-            except:
-                bot.edit_message_text("❌ *Speedtest failed*\nPlease install manually: `pip install speedtest-cli`", message.chat.id, progress_msg.message_id, parse_mode='Markdown')
-        except Exception as e:
-            bot.edit_message_text(f"❌ *Error:* `{str(e)}`", message.chat.id, progress_msg.message_id, parse_mode='Markdown')
-    
-    threading.Thread(target=speedtest_thread, daemon=True).start()
+    # One getMe round trip; everything else comes from counters collected as we go
+    started = time.perf_counter()
+    try:
+        bot.get_me()
+        telegram_rtt = f"{(time.perf_counter() - started) * 1000:.0f} ms"
+    except Exception as e:
+        telegram_rtt = f"failed ({type(e).__name__})"
+
+    system = diagnostics.system_snapshot(UPLOAD_DIR)
+    load = " / ".join(f"{l:.2f}" for l in system['loadavg']) if system['loadavg'] else "n/a"
+    children = system['children'] if system['children'] is not None else "n/a"
+    lag = queue_lag_probe.window.summary() if queue_lag_probe is not None else None
+
+    if keep_warm.enabled:
+        keep_warm_state = f"every {keep_warm.interval}s when idle"
+        if keep_warm.idle_timeouts:
+            keep_warm_state += f", spin-down seen after {min(keep_warm.idle_timeouts)}s"
+    else:
+        keep_warm_state = "off"
+    last_ping = keep_warm.last_ping
+    if last_ping:
+        last_ping = f"{last_ping['status']} in {last_ping['ms']:.0f} ms, {time.time() - last_ping['at']:.0f}s ago ({keep_warm.failures}/{keep_warm.pings} failed)"
+    touched = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds, _ in keep_warm.last_touch) or "none"
+
+    result = f"""🌐 *Diagnostics*
+
+📡 Telegram API (getMe): `{telegram_rtt}`
+⏳ Handler queue lag: `{format_latency(lag)}`
+🔀 API requests: `{format_latency(wsgi_latency.summary())}`
+
+🔥 Keep-warm: `{keep_warm_state}`
+📍 Last self-ping: `{last_ping or 'none yet'}`
+🔁 Pre-touched APIs: `{touched}`
+❄️ Cold requests: `{format_latency(keep_warm.cold_latency.summary())}`
+🌡️ Warm requests: `{format_latency(keep_warm.warm_latency.summary())}`
+
+🧵 Threads: `{system['threads']}`
+⚙️ Child processes: `{children}` (scripts: `{len(active_processes)}`)
+🧠 RSS: `{quotas.format_bytes(system['rss'])}`
+📈 Load avg: `{load}` ({system['cpus']} CPUs)
+💾 Disk free: `{quotas.format_bytes(system['disk_free'])} / {quotas.format_bytes(system['disk_total'])}`
+"""
+    bot.reply_to(message, result, parse_mode='Markdown')
 
 # --- Logs ---
 
-@bot.message_handler(func=lambda message: message.text == "📊 Logs")
+@router.text("📊 Logs")
 def view_logs(message):
     if message.from_user.id != ADMIN_ID:
         return bot.reply_to(message, "❌ *Admin only!*", parse_mode='Markdown')
@@ -540,7 +1245,7 @@ def view_logs(message):
     )
     bot.reply_to(message, "📊 *Log Management*\nSelect log type:", parse_mode='Markdown', reply_markup=keyboard)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("view_"))
+@router.callback("view_")
 def view_logs_callback(call):
     if call.from_user.id != ADMIN_ID: return bot.answer_callback_query(call.id, "❌ Admin only!")
     
@@ -572,11 +1277,11 @@ def send_log_content(call, log_file, log_type):
 
 # --- Status ---
 
-@bot.message_handler(func=lambda message: message.text == "ℹ️ Status")
+@router.text("ℹ️ Status")
 def bot_status_check(message):
     status = f"""
 🤖 *Bot Status*
-📁 Files: `{len(os.listdir(UPLOAD_DIR))}`
+📁 Files: `{len(list_uploads())}`
 ⚡ Scripts Running: `{len(active_processes)}`
 🌐 Hosted APIs: `{len(hosted_apis)}`
 📦 Installed Pkgs: `{len(installed_packages)}`
@@ -585,13 +1290,122 @@ def bot_status_check(message):
         status += "\n*Active APIs:*\n"
         for name, info in hosted_apis.items():
             status += f"- {name} ({info['path']})\n"
+
+    usage, limits = quota_store.snapshot(message.from_user.id), quota_store.limits
+    if message.from_user.id in quota_store.exempt:
+        status += "\n📊 *Your Quota:* unlimited (admin)\n"
+    else:
+        status += f"""
+📊 *Your Quota:*
+💾 Storage: `{quotas.format_bytes(usage['bytes'])} / {quotas.format_bytes(limits['bytes'])}`
+📁 Files: `{usage['files']} / {limits['files']}`
+⚡ Scripts: `{usage['scripts']} / {limits['scripts']}`
+🌐 APIs: `{usage['apis']} / {limits['apis']}`
+📨 Requests today: `{usage['requests']} / {limits['requests']}`
+"""
             
     bot.reply_to(message, status, parse_mode='Markdown')
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_main")
+@router.callback("back_to_main", exact=True)
 def back_to_main_callback(call):
     bot.edit_message_text("🔙 Main Menu", call.message.chat.id, call.message.message_id, reply_markup=create_transparent_keyboard())
 
+# --- Profiling (Admin) ---
+
+active_profiler = None
+
+def create_profile_keyboard():
+    keyboard = types.InlineKeyboardMarkup(row_width=1)
+    if active_profiler is not None and active_profiler.running:
+        keyboard.add(types.InlineKeyboardButton("⏹️ Stop & Dump", callback_data="prof_stop"))
+    else:
+        keyboard.add(types.InlineKeyboardButton("▶️ Profile whole process", callback_data="prof_start_all"))
+        for name in hosted_apis:
+            keyboard.add(types.InlineKeyboardButton(f"▶️ Profile API {name}", callback_data=f"prof_api_{name}"))
+    keyboard.add(
+        types.InlineKeyboardButton("⏱️ Handler times", callback_data="prof_handlers"),
+        types.InlineKeyboardButton("♻️ Reset handler times", callback_data="prof_reset")
+    )
+    return keyboard
+
+@bot.message_handler(commands=['profile'])
+def profile_menu(message):
+    if message.from_user.id != ADMIN_ID:
+        return bot.reply_to(message, "❌ *Admin only!*", parse_mode='Markdown')
+    state = f"🟢 Running: `{active_profiler.label}` ({active_profiler.duration:.0f}s)" if active_profiler is not None and active_profiler.running else "⚪ Idle"
+    bot.reply_to(message, f"🔬 *Profiler*\n{state}", parse_mode='Markdown', reply_markup=create_profile_keyboard())
+
+def send_profile_report(chat_id, prof):
+    msg = f"🔬 *Profile:* `{prof.label}`\n⏱️ {prof.duration:.1f}s, {prof.samples} samples\n\n*Top functions (self):*\n"
+    total = sum(prof.stacks.values()) or 1
+    for label, count in prof.top_functions(10):
+        msg += f"`{count * 100 / total:5.1f}%` `{label}`\n"
+    msg += "\n*Top stacks:*\n"
+    for stack, count in prof.top_stacks(5):
+        msg += f"`{count * 100 / total:5.1f}%` `{stack}`\n"
+    bot.send_message(chat_id, msg[:4000], parse_mode='Markdown')
+
+    dump_path = os.path.join(LOG_DIR, f"profile-{prof.label.replace('/', '_')}-{int(prof.started_at)}.collapsed")
+    with open(dump_path, 'w') as f:
+        f.write(prof.collapsed())
+    with open(dump_path, 'rb') as f:
+        bot.send_document(chat_id, f, caption="🔥 Collapsed stacks (flamegraph.pl / speedscope)")
+
+@router.callback("prof_")
+def profile_callback(call):
+    global active_profiler
+    if call.from_user.id != ADMIN_ID:
+        return bot.answer_callback_query(call.id, "❌ Admin only!")
+
+    if call.data in ("prof_start_all",) or call.data.startswith("prof_api_"):
+        if active_profiler is not None and active_profiler.running:
+            return bot.answer_callback_query(call.id, "⚠️ Already profiling")
+        if call.data == "prof_start_all":
+            active_profiler = SamplingProfiler(label="process").start()
+        else:
+            name = call.data[9:]
+            if name not in hosted_apis:
+                return bot.answer_callback_query(call.id, "❌ API not found")
+            # Only sample threads currently inside this API's WSGI app
+            tracked = hosted_apis[name]['wsgi']
+            active_profiler = SamplingProfiler(thread_filter=tracked.active_threads, label=name).start()
+        bot.answer_callback_query(call.id, "▶️ Profiling started")
+        bot.edit_message_text(f"🔬 *Profiler*\n🟢 Running: `{active_profiler.label}`", call.message.chat.id, call.message.message_id, parse_mode='Markdown', reply_markup=create_profile_keyboard())
+        log_action(call.from_user.id, f"Profiler started: {active_profiler.label}")
+
+    elif call.data == "prof_stop":
+        if active_profiler is None or not active_profiler.running:
+            return bot.answer_callback_query(call.id, "⚪ Profiler not running")
+        prof = active_profiler.stop()
+        bot.answer_callback_query(call.id, "⏹️ Stopped")
+        bot.edit_message_text("🔬 *Profiler*\n⚪ Idle", call.message.chat.id, call.message.message_id, parse_mode='Markdown', reply_markup=create_profile_keyboard())
+        send_profile_report(call.message.chat.id, prof)
+        log_action(call.from_user.id, f"Profiler stopped: {prof.label} ({prof.samples} samples)")
+
+    elif call.data == "prof_handlers":
+        rows = handler_timer.snapshot()
+        if not rows:
+            return bot.answer_callback_query(call.id, "No handler calls yet")
+        msg = "⏱️ *Handler wall time* (calls / total / avg / max)\n\n"
+        for name, calls, total, worst in rows[:25]:
+            msg += f"`{name}`: {calls} / {total:.2f}s / {total / calls * 1000:.0f}ms / {worst * 1000:.0f}ms\n"
+        bot.answer_callback_query(call.id)
+        bot.send_message(call.message.chat.id, msg, parse_mode='Markdown')
+
+    elif call.data == "prof_reset":
+        handler_timer.reset()
+        bot.answer_callback_query(call.id, "♻️ Handler times reset")
+
+def instrument_handlers():
+    # Wrap every registered message/callback handler with a wall-time recorder;
+    # routed handlers are timed per route by the router itself
+    for handler in bot.message_handlers + bot.callback_query_handlers:
+        if handler['function'] not in (router.dispatch_message, router.dispatch_callback):
+            handler['function'] = handler_timer.wrap(handler['function'])
+
+router.install(bot)
+instrument_handlers()
+
 # --- Main Execution ---
 
 def run_bot_polling():
@@ -603,13 +1417,60 @@ def run_bot_polling():
             log_action("system", f"Bot polling error: {e}, restarting in 5s...")
             time.sleep(5)
 
-if __name__ == '__main__':
+def run_async_bot():
+    try:
+        import async_core
+    except ImportError as e:
+        # aiohttp missing: run the sync bot rather than no bot at all
+        log_action("system", f"BOT_MODE=async unavailable ({e}), falling back to sync polling")
+        return run_bot_polling()
+    while True:
+        try:
+            async_core.run(sys.modules[__name__])
+        except Exception as e:
+            log_action("system", f"Async bot error: {e}, restarting in 5s...")
+            time.sleep(5)
+
+def start_services():
+    """Everything except the web server (coldstart.py calls this after binding the port)."""
+    global queue_lag_probe
     # 1. Start Bot Polling in Thread
-    bot_thread = threading.Thread(target=run_bot_polling)
+    bot_thread = threading.Thread(target=run_async_bot if BOT_MODE == "async" else run_bot_polling)
     bot_thread.daemon = True
     bot_thread.start()
     
-    # 2. Run Flask App (Main thread for Render)
+    # Sample how long updates wait for a free handler thread
+    if BOT_MODE != "async":
+        queue_lag_probe = diagnostics.QueueLagProbe(bot.worker_pool.put).start()
+
+    # Restore persisted schedules and start the timer thread
+    job_scheduler.load()
+    job_scheduler.start()
+
+    # Restore published files
+    static_registry.load()
+
+    # Restore quota counters; the background thread persists and reconciles them
+    quota_store.load()
+    quota_store.reconcile(UPLOAD_DIR, [], [])
+    quota_store.start_background(lambda: (
+        UPLOAD_DIR,
+        (p['user_id'] for p in list(active_processes.values()) if p.get('user_id') is not None),
+        (i['user_id'] for i in list(hosted_apis.values()))
+    ))
+
+    # Learn from the previous process' idle spin-down, then self-ping while idle
+    keep_warm.load()
+    keep_warm.start()
+
+    # Warm up the fork server before the first ⚡ Run
+    if fork_server is not None:
+        threading.Thread(target=fork_server.start, daemon=True).start()
+
+if __name__ == '__main__':
+    start_services()
+
+    # Run Flask App (Main thread for Render)
     port = int(os.environ.get("PORT", 5000))
     print(f"🚀 Starting Flask Server on port {port}...")
     app.run(host="0.0.0.0", port=port, use_reloader=False)
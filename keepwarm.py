@@ -0,0 +1,158 @@
+"""
+Keep-warm for the Render web service.
+
+Render puts a free instance to sleep after a stretch without inbound HTTP
+traffic, and the next Telegram update or hosted-API request then pays for a
+cold boot plus re-importing every API. KeepWarm:
+
+- wraps the WSGI app to note every inbound request and time it, split into
+  cold (first request of this process, or after COLD_AFTER quiet seconds) and
+  warm samples; latency is measured up to the response iterable being returned.
+  Its own pings carry a KEEPWARM_HEADER and are neither timed nor counted as
+  traffic, so they can't pass for user requests
+- when nothing came in for `interval` seconds, requests the service's own
+  public URL (RENDER_EXTERNAL_HOSTNAME, or KEEPWARM_URL for a local stand-in)
+  so the request goes back in through Render's proxy, then pre-touches the
+  KEEPWARM_TOP_APIS most used hosted APIs in-process
+- persists a heartbeat: when a new process finds the previous one stopped
+  after sitting idle (no heartbeat for a while), the idle time is an observed
+  spin-down timeout and the interval is cut to SAFETY times the shortest one
+"""
+import os
+import json
+import time
+import threading
+
+import diagnostics
+
+KEEPWARM_ENABLED = os.environ.get("KEEPWARM_ENABLED", "1" if os.environ.get("RENDER") else "0") == "1"
+KEEPWARM_URL = os.environ.get("KEEPWARM_URL")  # Overrides the public URL, e.g. http://127.0.0.1:5000
+KEEPWARM_INTERVAL = int(os.environ.get("KEEPWARM_INTERVAL", "600"))
+KEEPWARM_MIN_INTERVAL = int(os.environ.get("KEEPWARM_MIN_INTERVAL", "60"))
+KEEPWARM_TOP_APIS = int(os.environ.get("KEEPWARM_TOP_APIS", "3"))
+HEARTBEAT = int(os.environ.get("KEEPWARM_HEARTBEAT", "60"))
+COLD_AFTER = int(os.environ.get("KEEPWARM_COLD_AFTER", "300"))
+SAFETY = 0.6
+PING_TIMEOUT = 10
+KEEPWARM_HEADER = "X-Keep-Warm"
+MAX_OBSERVATIONS = 10
+
+
+class KeepWarm:
+    def __init__(self, state_path, target, touch=None, enabled=KEEPWARM_ENABLED):
+        self.state_path = state_path
+        self.target = target  # () -> base URL, replaceable for tests
+        self.touch = touch  # touch(n) -> [(api name, seconds, status)]
+        self.enabled = enabled
+        self.interval = KEEPWARM_INTERVAL
+        self.idle_timeouts = []  # Observed seconds of inactivity before a spin-down
+        self.last_request = None  # time.time() of the last inbound request
+        self.last_ping = None  # {'at', 'status', 'ms'}
+        self.last_ping_ok = None  # time.time() of the last ping answered with 200
+        self.last_touch = []
+        self.pings = 0
+        self.failures = 0
+        self.started = time.time()
+        self.cold_latency = diagnostics.LatencyWindow(maxlen=200)
+        self.warm_latency = diagnostics.LatencyWindow()
+
+    # --- Inbound requests ---
+
+    def middleware(self, wsgi_app):
+        environ_key = "HTTP_" + KEEPWARM_HEADER.upper().replace("-", "_")
+
+        def timed(environ, start_response):
+            if environ.get(environ_key):
+                return wsgi_app(environ, start_response)
+            now = time.time()
+            cold = self.last_request is None or now - self.last_request > COLD_AFTER
+            self.last_request = now
+            started = time.perf_counter()
+            try:
+                return wsgi_app(environ, start_response)
+            finally:
+                (self.cold_latency if cold else self.warm_latency).record(time.perf_counter() - started)
+        return timed
+
+    # --- State ---
+
+    def load(self):
+        """Restores the learned interval and checks whether the last process went to sleep."""
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, 'r') as f:
+            state = json.load(f)
+        self.idle_timeouts = state.get('idle_timeouts', [])
+        last_seen = state.get('last_seen')
+        # A ping that got through resets the platform's idle timer like a request does
+        last_inbound = max(state.get('last_request') or 0, state.get('last_ping_ok') or 0)
+        if last_seen and last_inbound:
+            idle = last_seen - last_inbound
+            # A redeploy restarts within a heartbeat or two, a spin-down after idling does not
+            if self.started - last_seen > 2 * HEARTBEAT and idle >= KEEPWARM_MIN_INTERVAL:
+                self.idle_timeouts = (self.idle_timeouts + [round(idle)])[-MAX_OBSERVATIONS:]
+        self.interval = self.adapted_interval()
+
+    def adapted_interval(self):
+        if not self.idle_timeouts:
+            return KEEPWARM_INTERVAL
+        return max(KEEPWARM_MIN_INTERVAL, min(KEEPWARM_INTERVAL, int(min(self.idle_timeouts) * SAFETY)))
+
+    def save(self):
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        state = {
+            'last_seen': time.time(),
+            'last_request': self.last_request,
+            'last_ping_ok': self.last_ping_ok,
+            'interval': self.interval,
+            'idle_timeouts': self.idle_timeouts,
+        }
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    # --- Pinging ---
+
+    def idle_for(self):
+        # A ping that never reaches us (wrong URL, outage) still waits a full interval
+        last = max(self.last_request or self.started, self.last_ping['at'] if self.last_ping else 0)
+        return time.time() - last
+
+    def ping(self):
+        import urllib.request  # Only needed once the service has been idle
+        started = time.perf_counter()
+        request = urllib.request.Request(self.target().rstrip('/') + '/', headers={KEEPWARM_HEADER: '1'})
+        try:
+            with urllib.request.urlopen(request, timeout=PING_TIMEOUT) as response:
+                response.read()
+                status = response.status
+        except Exception as e:
+            status = getattr(e, 'code', None) or type(e).__name__
+        self.pings += 1
+        self.last_ping = {'at': time.time(), 'status': status, 'ms': (time.perf_counter() - started) * 1000}
+        if status == 200:
+            self.last_ping_ok = self.last_ping['at']
+        else:
+            self.failures += 1
+        if self.touch is not None and KEEPWARM_TOP_APIS > 0:
+            self.last_touch = self.touch(KEEPWARM_TOP_APIS)
+        return self.last_ping
+
+    def tick(self):
+        if self.enabled and self.idle_for() >= self.interval:
+            self.ping()
+        self.save()
+
+    def start(self):
+        def loop():
+            while True:
+                time.sleep(HEARTBEAT)
+                try:
+                    self.tick()
+                except Exception:
+                    pass
+        threading.Thread(target=loop, name="keepwarm", daemon=True).start()
+        return self
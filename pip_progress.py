@@ -0,0 +1,207 @@
+"""
+Streamed, cancellable pip runs for 📦 Install.
+
+PipRun executes one or more pip commands (wheelhouse fill, then env install)
+reading their output line by line. Only the last `tail_lines` lines of each
+stream are kept, the current phase (collecting / downloading / building /
+installing) is tracked from pip's stdout and `on_progress(run)` is called at
+most once per `min_interval` seconds so Telegram edits stay under the rate
+limit. Each command runs in its own session, so cancel() kills pip together
+with the build backends it spawned.
+
+run() blocks its thread and reads stderr on a second one; run_async() does the
+same on the event loop with an asyncio subprocess and no extra thread.
+
+Success is decided by pip's exit code, not by scanning stderr: pip prints
+WARNING/DEPRECATION lines on successful installs too.
+"""
+import os
+import time
+import asyncio
+import signal
+import threading
+import contextlib
+import subprocess
+from collections import deque
+
+PHASES = (
+    ("Collecting ", "🔎 Collecting"),
+    ("Requirement already satisfied", "✔️ Already satisfied"),
+    ("Downloading ", "⬇️ Downloading"),
+    ("Using cached ", "💾 Using cached"),
+    ("Processing ", "📂 Processing"),
+    ("Building wheel", "🔨 Building"),
+    ("Created wheel", "🔨 Building"),
+    ("Saved ", "💾 Saving to wheelhouse"),
+    ("Installing collected packages", "📥 Installing"),
+    ("Successfully", "✅ Done"),
+)
+KILL_GRACE = 3
+LOCK_POLL = 0.2
+
+# Step locks are threading locks (shared with sync installs); coroutines on one
+# loop all run in its thread, so each lock also gets an asyncio guard
+_async_guards = {}
+
+
+def _async_guard(lock):
+    return _async_guards.setdefault(lock, asyncio.Lock())
+
+
+def _exited(process):
+    if isinstance(process, subprocess.Popen):
+        return process.poll() is not None
+    return process.returncode is not None
+
+
+class PipRun:
+    def __init__(self, steps, on_progress=None, min_interval=2.0, tail_lines=30, cleanup=None):
+        # steps: [(argv_factory, lock or None)], argv built lazily right before each command
+        self.steps = steps
+        self.cleanup = cleanup  # Called once the run ends, whatever the outcome
+        self.on_progress = on_progress
+        self.min_interval = min_interval
+        self.stdout_tail = deque(maxlen=tail_lines)
+        self.stderr_tail = deque(maxlen=tail_lines)
+        self.lines = 0
+        self.warnings = 0
+        self.phase = "⏳ Starting"
+        self.detail = ""
+        self.returncode = None
+        self.cancelled = False
+        self.started = time.time()
+        self._process = None
+        self._last_progress = 0.0
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.cancelled
+
+    def _classify(self, line):
+        for prefix, label in PHASES:
+            if line.startswith(prefix):
+                self.phase = label
+                self.detail = line[:100]
+                return
+
+    def _report(self):
+        now = time.monotonic()
+        if self.on_progress is None or now - self._last_progress < self.min_interval:
+            return
+        self._last_progress = now
+        try:
+            self.on_progress(self)
+        except Exception:
+            pass  # Progress edits are best effort (rate limits, unchanged text...)
+
+    def _stdout_line(self, line):
+        line = line.rstrip()
+        if not line:
+            return
+        self.lines += 1
+        self.stdout_tail.append(line)
+        self._classify(line)
+        self._report()
+
+    def _stderr_line(self, line):
+        line = line.rstrip()
+        if not line:
+            return
+        if line.startswith(("WARNING:", "DEPRECATION:")):
+            self.warnings += 1
+        self.stderr_tail.append(line)
+
+    def _read_stderr(self, stream):
+        for line in stream:
+            self._stderr_line(line)
+
+    def _run_step(self, argv):
+        self._process = subprocess.Popen(
+            argv, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, bufsize=1, start_new_session=True
+        )
+        if self.cancelled:
+            self._kill()  # Cancelled while the command was being prepared
+        stderr_reader = threading.Thread(target=self._read_stderr, args=(self._process.stderr,), daemon=True)
+        stderr_reader.start()
+        for line in self._process.stdout:
+            self._stdout_line(line)
+        self.returncode = self._process.wait()
+        stderr_reader.join()
+
+    def run(self):
+        try:
+            for argv_factory, lock in self.steps:
+                if self.cancelled:
+                    break
+                with lock or contextlib.nullcontext():
+                    self._run_step(argv_factory())
+                if self.returncode != 0:
+                    break
+        finally:
+            if self.cleanup is not None:
+                self.cleanup()
+        if self.cancelled:
+            self.phase = "✖️ Cancelled"
+        return self
+
+    async def _run_step_async(self, argv):
+        self._process = await asyncio.create_subprocess_exec(
+            *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            start_new_session=True, limit=1024 * 1024
+        )
+        if self.cancelled:
+            self._kill()
+
+        async def drain(stream, handle):
+            async for raw in stream:
+                handle(raw.decode(errors='replace'))
+
+        await asyncio.gather(drain(self._process.stdout, self._stdout_line), drain(self._process.stderr, self._stderr_line))
+        self.returncode = await self._process.wait()
+
+    async def run_async(self):
+        """run() on the event loop: on_progress is then called from the loop."""
+        try:
+            for argv_factory, lock in self.steps:
+                if self.cancelled:
+                    break
+                if lock is None:
+                    await self._run_step_async(argv_factory())
+                else:
+                    async with _async_guard(lock):
+                        while not lock.acquire(blocking=False):
+                            await asyncio.sleep(LOCK_POLL)
+                        try:
+                            await self._run_step_async(argv_factory())
+                        finally:
+                            lock.release()
+                if self.returncode != 0:
+                    break
+        finally:
+            if self.cleanup is not None:
+                self.cleanup()
+        if self.cancelled:
+            self.phase = "✖️ Cancelled"
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+        self._kill()
+
+    def _kill(self):
+        process = self._process
+        if process is None or _exited(process):
+            return
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+
+        def force():
+            if not _exited(process):
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        threading.Timer(KILL_GRACE, force).start()
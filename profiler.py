@@ -0,0 +1,123 @@
+"""
+Low-overhead statistical profiling for the bot process.
+
+SamplingProfiler wakes every `interval` seconds, grabs every thread's
+current frame via sys._current_frames() and counts the stacks, so the cost
+is proportional to the sample rate, not to the work being profiled. Stacks
+can be restricted to a set of threads (e.g. the ones currently serving a
+hosted API) and are exported in the collapsed format read by flamegraph.pl
+and speedscope.
+
+HandlerTimer records wall time per telebot handler.
+"""
+import os
+import sys
+import time
+import threading
+import functools
+from collections import Counter
+
+DEFAULT_INTERVAL = float(os.environ.get("PROFILER_INTERVAL_MS", "10")) / 1000
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=DEFAULT_INTERVAL, thread_filter=None, label="process"):
+        # thread_filter() -> set of thread idents to sample, None samples all threads
+        self.interval = interval
+        self.thread_filter = thread_filter
+        self.label = label
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def duration(self):
+        end = self.stopped_at or time.time()
+        return end - self.started_at if self.started_at else 0
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.time()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            wanted = self.thread_filter() if self.thread_filter else None
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (wanted is not None and ident not in wanted):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Stacks as `root;caller;leaf count` lines (flamegraph.pl / speedscope)."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def top_functions(self, n=15):
+        # Leaf (self) samples per function: where the time is actually spent
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack[-1]] += count
+        return leaves.most_common(n)
+
+    def top_stacks(self, n=5, depth=4):
+        trimmed = Counter()
+        for stack, count in self.stacks.items():
+            trimmed[" → ".join(stack[-depth:])] += count
+        return trimmed.most_common(n)
+
+
+class HandlerTimer:
+    def __init__(self):
+        self.stats = {}  # name -> [calls, total_seconds, max_seconds]
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            entry = self.stats.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def wrap(self, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(func.__name__, time.perf_counter() - started)
+        return timed
+
+    def snapshot(self):
+        with self._lock:
+            return sorted(((name, *entry) for name, entry in self.stats.items()), key=lambda e: -e[2])
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
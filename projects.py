@@ -0,0 +1,184 @@
+"""
+Multi-file project uploads (.zip / .tar.gz / .tgz).
+
+Archives are extracted entry by entry into a staging directory with size and
+entry-count limits enforced while bytes are written (never from the headers
+alone), then swapped into `uploads/<project>/` in one rename. A project is
+shown in the file lists as `<project>/` and runs/hosts from its entry point.
+"""
+import os
+import shutil
+import tarfile
+import zipfile
+import tempfile
+
+MAX_PROJECT_BYTES = int(os.environ.get("PROJECT_MAX_BYTES", str(50 * 1024 * 1024)))
+MAX_PROJECT_ENTRIES = int(os.environ.get("PROJECT_MAX_ENTRIES", "2000"))
+ENTRY_POINTS = ["main.py", "app.py", "api.py", "bot.py", "server.py", "run.py"]
+ARCHIVE_SUFFIXES = (".zip", ".tar.gz", ".tgz")
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ProjectError(Exception):
+    pass
+
+
+def is_archive(file_name):
+    return file_name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def project_name(archive_name):
+    base = os.path.basename(archive_name)
+    for suffix in ARCHIVE_SUFFIXES:
+        if base.lower().endswith(suffix):
+            return base[:-len(suffix)]
+    return base
+
+
+class _Budget:
+    def __init__(self, max_bytes=MAX_PROJECT_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries = 0
+
+    def add_entry(self):
+        self.entries += 1
+        if self.entries > MAX_PROJECT_ENTRIES:
+            raise ProjectError(f"Archive has more than {MAX_PROJECT_ENTRIES} entries")
+
+    def add_bytes(self, n):
+        self.bytes += n
+        if self.bytes > self.max_bytes:
+            limit = f"{self.max_bytes // (1024 * 1024)} MB" if self.max_bytes >= 1024 * 1024 else f"{self.max_bytes // 1024} KB"
+            raise ProjectError(f"Archive expands to more than {limit}")
+
+
+def _safe_target(root, member_name):
+    """Target path of an archive member, None for the root itself (`.` from `tar -C dir .`)."""
+    # Reject absolute paths and `..` escapes (zip-slip)
+    if os.path.isabs(member_name):
+        raise ProjectError(f"Unsafe path in archive: {member_name}")
+    while member_name.startswith("./"):
+        member_name = member_name[2:]
+    root = os.path.abspath(root)
+    target = os.path.abspath(os.path.join(root, member_name))
+    if target == root:
+        return None
+    if not target.startswith(root + os.sep):
+        raise ProjectError(f"Unsafe path in archive: {member_name}")
+    return target
+
+
+def _copy_stream(src, target, budget):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as dst:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            budget.add_bytes(len(chunk))
+            dst.write(chunk)
+
+
+def _extract_zip(archive_path, root, budget):
+    with zipfile.ZipFile(archive_path) as zf:
+        for info in zf.infolist():
+            budget.add_entry()
+            target = _safe_target(root, info.filename)
+            if target is None:
+                continue
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            with zf.open(info) as src:
+                _copy_stream(src, target, budget)
+
+
+def _extract_tar(archive_path, root, budget):
+    # "r|gz" reads the archive strictly sequentially
+    with tarfile.open(archive_path, mode="r|gz") as tf:
+        for member in tf:
+            budget.add_entry()
+            target = _safe_target(root, member.name)
+            if target is None:
+                continue
+            if member.isdir():
+                os.makedirs(target, exist_ok=True)
+            elif member.isfile():
+                _copy_stream(tf.extractfile(member), target, budget)
+            # Links, devices and fifos are skipped
+
+
+def _project_root(staging):
+    # Archives often wrap everything in one top-level folder
+    entries = [e for e in os.listdir(staging) if not e.startswith('__MACOSX')]
+    if len(entries) == 1 and os.path.isdir(os.path.join(staging, entries[0])):
+        return os.path.join(staging, entries[0])
+    return staging
+
+
+def extract_project(archive_path, upload_dir, name, validate=None, max_bytes=None):
+    """
+    Extracts an archive into upload_dir/name, replacing any previous version.
+    `validate(root)` runs on the staged tree before the swap and may raise.
+    `max_bytes` lowers the size limit (e.g. to what is left of a user's quota).
+    """
+    staging = tempfile.mkdtemp(prefix=f".{name}-", dir=upload_dir)
+    budget = _Budget(MAX_PROJECT_BYTES if max_bytes is None else min(max_bytes, MAX_PROJECT_BYTES))
+    try:
+        if archive_path.lower().endswith(".zip"):
+            _extract_zip(archive_path, staging, budget)
+        else:
+            _extract_tar(archive_path, staging, budget)
+        root = _project_root(staging)
+        if validate is not None:
+            validate(root)
+
+        project_dir = os.path.join(upload_dir, name)
+        old_dir = None
+        if os.path.exists(project_dir):
+            old_dir = tempfile.mkdtemp(prefix=f".{name}-old-", dir=upload_dir)
+            os.rmdir(old_dir)
+            os.rename(project_dir, old_dir)
+        os.rename(root, project_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+        return project_dir, budget
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+        raise ProjectError(f"Corrupt archive: {e}")
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def find_entry_point(project_dir):
+    for candidate in ENTRY_POINTS:
+        if os.path.isfile(os.path.join(project_dir, candidate)):
+            return os.path.join(project_dir, candidate)
+    scripts = [f for f in os.listdir(project_dir) if f.endswith('.py')]
+    if len(scripts) == 1:
+        return os.path.join(project_dir, scripts[0])
+    return None
+
+
+def iter_python_files(project_dir):
+    for dirpath, _, filenames in os.walk(project_dir):
+        for f in filenames:
+            if f.endswith('.py'):
+                yield os.path.join(dirpath, f)
+
+
+def top_level_names(project_dir):
+    """Module and package names the project's own files can be imported as."""
+    names = set()
+    for entry in os.listdir(project_dir):
+        if os.path.isdir(os.path.join(project_dir, entry)):
+            name = entry
+        else:
+            name, ext = os.path.splitext(entry)
+            if ext not in ('.py', '.so', '.pyd'):
+                continue
+            name = name.split('.')[0]  # Extension modules carry an ABI tag: mod.cpython-312-x86_64-linux-gnu.so
+        if name.isidentifier():
+            names.add(name)
+    return names
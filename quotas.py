@@ -0,0 +1,271 @@
+"""
+Per-user quotas backed by incrementally maintained counters.
+
+Every upload, delete, script start/stop and API host/stop adjusts the
+owner's counters in O(1), so checks never walk `uploads/`. Counters and file
+ownership are persisted to JSON and a background thread periodically
+reconciles them with what is actually on disk / running, correcting any
+drift (crashes, files removed by hand, ...).
+"""
+import os
+import json
+import time
+import threading
+from datetime import date
+
+LIMITS = {
+    'bytes': int(os.environ.get("QUOTA_MAX_BYTES", str(100 * 1024 * 1024))),
+    'files': int(os.environ.get("QUOTA_MAX_FILES", "50")),
+    'scripts': int(os.environ.get("QUOTA_MAX_SCRIPTS", "3")),
+    'apis': int(os.environ.get("QUOTA_MAX_APIS", "3")),
+    'requests': int(os.environ.get("QUOTA_MAX_REQUESTS_DAY", "10000")),
+}
+SAVE_INTERVAL = int(os.environ.get("QUOTA_SAVE_SECONDS", "30"))
+RECONCILE_INTERVAL = int(os.environ.get("QUOTA_RECONCILE_SECONDS", "600"))
+
+
+def format_bytes(n):
+    if n >= 1024 ** 3:
+        return f"{n / 1024 ** 3:.1f} GB"
+    if n >= 1024 * 1024:
+        return f"{n / (1024 * 1024):.1f} MB"
+    return f"{n / 1024:.1f} KB"
+
+
+def path_usage(path):
+    """(bytes, file count) of an upload: a single file or a project directory."""
+    if os.path.isdir(path):
+        total, count = 0, 0
+        for dirpath, _, filenames in os.walk(path):
+            for f in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, f))
+                    count += 1
+                except OSError:
+                    pass
+        return total, count
+    return os.path.getsize(path), 1
+
+
+class QuotaStore:
+    def __init__(self, store_path, limits=LIMITS, exempt=()):
+        self.store_path = store_path
+        self.limits = dict(limits)
+        self.exempt = set(exempt)
+        self.usage = {}  # user_id -> counters
+        self.files = {}  # upload name -> [owner, bytes, file_count]
+        self.pending = {}  # (kind, user_id) -> slots reserved but not yet in live state
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def _user(self, user_id):
+        entry = self.usage.get(user_id)
+        if entry is None:
+            entry = self.usage[user_id] = {'bytes': 0, 'files': 0, 'scripts': 0, 'apis': 0, 'requests': 0, 'day': ''}
+        return entry
+
+    # --- Persistence ---
+
+    def load(self):
+        if not os.path.exists(self.store_path):
+            return
+        with open(self.store_path, 'r') as f:
+            data = json.load(f)
+        with self._lock:
+            self.files = {name: list(v) for name, v in data.get('files', {}).items()}
+            self.usage = {int(uid): u for uid, u in data.get('usage', {}).items()}
+            # Live counters restart at zero, whatever was running died with the process
+            for entry in self.usage.values():
+                entry['scripts'] = 0
+                entry['apis'] = 0
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({'files': self.files, 'usage': {str(k): v for k, v in self.usage.items()}})
+            self._dirty = False
+        directory = os.path.dirname(self.store_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.store_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+        os.replace(tmp_path, self.store_path)
+
+    # --- Storage ---
+
+    def remaining_bytes(self, user_id, replacing=None):
+        with self._lock:
+            if user_id in self.exempt:
+                return None
+            used = self._user(user_id)['bytes']
+            old = self.files.get(replacing)
+            if old and old[0] == user_id:
+                used -= old[1]
+            return max(0, self.limits['bytes'] - used)
+
+    def check_upload(self, user_id, name, size, file_count=1):
+        """Returns an error message, or None when the upload fits."""
+        with self._lock:
+            if user_id in self.exempt:
+                return None
+            usage = self._user(user_id)
+            old = self.files.get(name)
+            freed_bytes, freed_files = (old[1], old[2]) if old and old[0] == user_id else (0, 0)
+            if usage['bytes'] - freed_bytes + size > self.limits['bytes']:
+                return f"Storage quota exceeded ({format_bytes(self.limits['bytes'])})"
+            if usage['files'] - freed_files + file_count > self.limits['files']:
+                return f"File quota exceeded ({self.limits['files']} files)"
+            return None
+
+    def record_upload(self, user_id, name, size, file_count=1):
+        with self._lock:
+            self._forget(name)
+            self.files[name] = [user_id, size, file_count]
+            usage = self._user(user_id)
+            usage['bytes'] += size
+            usage['files'] += file_count
+            self._dirty = True
+
+    def _forget(self, name):
+        old = self.files.pop(name, None)
+        if old:
+            usage = self._user(old[0])
+            usage['bytes'] = max(0, usage['bytes'] - old[1])
+            usage['files'] = max(0, usage['files'] - old[2])
+            self._dirty = True
+
+    def record_delete(self, name):
+        with self._lock:
+            self._forget(name)
+
+    def owner(self, name):
+        """User billed for an upload, None for files that predate quotas."""
+        entry = self.files.get(name)
+        return entry[0] if entry else None
+
+    # --- Scripts & APIs (reserve, activate once live, release when done) ---
+    # A reservation stays pending until the script/API shows up in the live
+    # state reconcile() is given, so a reconcile meanwhile keeps counting it.
+
+    def _drop_pending(self, kind, user_id):
+        key = (kind, user_id)
+        if self.pending.get(key, 0) <= 1:
+            self.pending.pop(key, None)
+        else:
+            self.pending[key] -= 1
+
+    def _acquire(self, user_id, kind, label):
+        with self._lock:
+            usage = self._user(user_id)
+            if user_id not in self.exempt and usage[kind] >= self.limits[kind]:
+                return f"{label} quota reached ({self.limits[kind]})"
+            usage[kind] += 1
+            self.pending[(kind, user_id)] = self.pending.get((kind, user_id), 0) + 1
+            return None
+
+    def _activate(self, user_id, kind):
+        with self._lock:
+            self._drop_pending(kind, user_id)
+
+    def _release(self, user_id, kind, pending):
+        with self._lock:
+            usage = self._user(user_id)
+            usage[kind] = max(0, usage[kind] - 1)
+            if pending:
+                self._drop_pending(kind, user_id)
+
+    def acquire_script(self, user_id):
+        return self._acquire(user_id, 'scripts', "Concurrent script")
+
+    def activate_script(self, user_id):
+        self._activate(user_id, 'scripts')
+
+    def release_script(self, user_id, pending=False):
+        # pending=True: released before activate_script (the run never started)
+        self._release(user_id, 'scripts', pending)
+
+    def acquire_api(self, user_id):
+        return self._acquire(user_id, 'apis', "Hosted API")
+
+    def activate_api(self, user_id):
+        self._activate(user_id, 'apis')
+
+    def release_api(self, user_id, pending=False):
+        self._release(user_id, 'apis', pending)
+
+    # --- Requests ---
+
+    def allow_request(self, user_id):
+        today = date.today().isoformat()
+        with self._lock:
+            usage = self._user(user_id)
+            if usage['day'] != today:
+                usage['day'] = today
+                usage['requests'] = 0
+            usage['requests'] += 1
+            self._dirty = True
+            return user_id in self.exempt or usage['requests'] <= self.limits['requests']
+
+    # --- Reporting & reconciliation ---
+
+    def snapshot(self, user_id):
+        with self._lock:
+            usage = dict(self._user(user_id))
+        if usage['day'] != date.today().isoformat():
+            usage['requests'] = 0
+        return usage
+
+    def reconcile(self, upload_dir, live_scripts, live_apis):
+        """
+        Rebuilds counters from the filesystem, live state and pending reservations.
+        live_scripts / live_apis: iterables of owner user ids, consumed under the
+        lock (pass generators so they are read atomically with `pending`).
+        """
+        sizes = {}
+        for name in os.listdir(upload_dir):
+            if name.startswith('.'):
+                continue
+            path = os.path.join(upload_dir, name)
+            key = name + '/' if os.path.isdir(path) else name
+            try:
+                sizes[key] = path_usage(path)
+            except OSError:
+                pass
+
+        with self._lock:
+            for usage in self.usage.values():
+                usage.update(bytes=0, files=0, scripts=0, apis=0)
+            files = {}
+            for key, (size, count) in sizes.items():
+                owner = self.files.get(key, [None])[0]
+                if owner is None:
+                    continue  # Uploaded before quotas existed: nobody to bill
+                files[key] = [owner, size, count]
+                usage = self._user(owner)
+                usage['bytes'] += size
+                usage['files'] += count
+            self.files = files
+            for owner in live_scripts:
+                self._user(owner)['scripts'] += 1
+            for owner in live_apis:
+                self._user(owner)['apis'] += 1
+            for (kind, owner), count in self.pending.items():
+                self._user(owner)[kind] += count
+            self._dirty = True
+
+    def start_background(self, live_state):
+        """live_state() -> (upload_dir, script owners, api owners); runs save + reconcile."""
+        def loop():
+            last_reconcile = time.time()
+            while True:
+                time.sleep(SAVE_INTERVAL)
+                try:
+                    if time.time() - last_reconcile >= RECONCILE_INTERVAL:
+                        self.reconcile(*live_state())
+                        last_reconcile = time.time()
+                    self.save()
+                except Exception:
+                    pass
+        threading.Thread(target=loop, daemon=True).start()
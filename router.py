@@ -0,0 +1,120 @@
+"""
+O(1) routing for reply-keyboard texts and callback data.
+
+telebot tries handlers one by one, calling every `func=` filter until one
+matches, so each update costs a walk over all registered lambdas and
+`startswith` prefixes can shadow each other depending on registration
+order. Router keeps keyboard texts in one dict and callback prefixes in a
+trie, and installs a single message handler plus a single callback handler:
+
+    router = Router(timer)
+
+    @router.text("📂 Files")
+    def list_files(message): ...
+
+    @router.callback("stop_api_")              # prefix, longest match wins
+    def stop_api_callback(call): ...
+
+    @router.callback("confirm_delete_all", exact=True)
+    def confirm_delete_all_callback(call): ...
+
+    router.install(bot)                        # after all routes are declared
+
+Updates that match no route fall through to the bot's other handlers.
+"""
+import time
+
+
+class RouteConflict(ValueError):
+    pass
+
+
+class _Node:
+    __slots__ = ("children", "route")
+
+    def __init__(self):
+        self.children = {}
+        self.route = None
+
+
+class PrefixTrie:
+    """Character trie returning the longest registered prefix of a string."""
+
+    def __init__(self):
+        self.root = _Node()
+
+    def insert(self, prefix, route):
+        node = self.root
+        for char in prefix:
+            node = node.children.setdefault(char, _Node())
+        if node.route is not None:
+            raise RouteConflict(f"Callback prefix {prefix!r} registered twice")
+        node.route = route
+
+    def longest(self, text):
+        node, best = self.root, self.root.route
+        for char in text:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.route is not None:
+                best = node.route
+        return best
+
+
+class Router:
+    def __init__(self, timer=None):
+        self.timer = timer  # profiler.HandlerTimer, per-route wall time
+        self.texts = {}
+        self.exact_callbacks = {}
+        self.prefixes = PrefixTrie()
+
+    # --- Registration ---
+
+    def text(self, *texts):
+        def decorator(func):
+            for text in texts:
+                if text in self.texts:
+                    raise RouteConflict(f"Keyboard text {text!r} registered twice")
+                self.texts[text] = func
+            return func
+        return decorator
+
+    def callback(self, data, exact=False):
+        def decorator(func):
+            if exact:
+                if data in self.exact_callbacks:
+                    raise RouteConflict(f"Callback {data!r} registered twice")
+                self.exact_callbacks[data] = func
+            else:
+                self.prefixes.insert(data, func)
+            return func
+        return decorator
+
+    # --- Matching & dispatch ---
+
+    def match_message(self, message):
+        return self.texts.get(message.text) if message.text is not None else None
+
+    def match_callback(self, call):
+        if call.data is None:
+            return None
+        return self.exact_callbacks.get(call.data) or self.prefixes.longest(call.data)
+
+    def _run(self, func, update):
+        started = time.perf_counter()
+        try:
+            return func(update)
+        finally:
+            if self.timer is not None:
+                self.timer.record(func.__name__, time.perf_counter() - started)
+
+    def dispatch_message(self, message):
+        return self._run(self.match_message(message), message)
+
+    def dispatch_callback(self, call):
+        return self._run(self.match_callback(call), call)
+
+    def install(self, bot):
+        bot.register_message_handler(self.dispatch_message, func=lambda message: self.match_message(message) is not None)
+        bot.register_callback_query_handler(self.dispatch_callback, func=lambda call: self.match_callback(call) is not None)
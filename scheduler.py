@@ -0,0 +1,270 @@
+"""
+Persistent job scheduler for recurring ⚡ Run executions.
+
+Jobs live in a JSON file and in one min-heap ordered by next run time. A
+single thread sleeps on a condition variable until the earliest deadline (or
+until a job is added/removed), so thousands of idle jobs cost no CPU.
+
+Schedule syntax:
+    every 30m              interval (s, m, h, d)
+    */15 * * * *           5-field cron: minute hour day month weekday (0=Sun)
+Optional trailing options:
+    jitter=60              random 0..60s delay per run
+    missed=skip|run        what to do with a run missed while the bot was down
+"""
+import os
+import json
+import heapq
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+MISSED_POLICIES = ("skip", "run")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+
+class ScheduleError(ValueError):
+    pass
+
+
+# --- Schedule parsing ---
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ScheduleError(f"Invalid step: {step_text}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+        else:
+            start = end = int(part)
+        if start < low or end > high or start > end:
+            raise ScheduleError(f"Value out of range {low}-{high}: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSpec:
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ScheduleError("Cron needs 5 fields: minute hour day month weekday")
+        try:
+            parsed = [_parse_field(f, low, high) for f, (low, high) in zip(fields, _FIELDS)]
+        except ValueError as e:
+            raise ScheduleError(str(e))
+        self.minutes, self.hours, self.days, self.months, self.weekdays = parsed
+        # Standard cron: if both day fields are restricted, either may match
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def _day_matches(self, dt):
+        weekday = (dt.weekday() + 1) % 7
+        day_ok = dt.day in self.days
+        weekday_ok = weekday in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, ts):
+        dt = datetime.fromtimestamp(ts).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        # Skip whole months/days/hours that can't match instead of scanning minutes
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+            if dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+                continue
+            return dt.timestamp()
+        raise ScheduleError("Schedule never fires")
+
+
+class IntervalSpec:
+    def __init__(self, text):
+        text = text.strip().lower()
+        if len(text) < 2 or text[-1] not in _UNITS or not text[:-1].isdigit():
+            raise ScheduleError("Interval must look like 30s, 15m, 2h or 1d")
+        self.seconds = int(text[:-1]) * _UNITS[text[-1]]
+        if self.seconds < 60:
+            raise ScheduleError("Minimum interval is 60s")
+
+    def next_after(self, ts):
+        return ts + self.seconds
+
+
+def parse_schedule(text):
+    """Returns (spec_string, options) after validating `text`."""
+    tokens = text.strip().split()
+    options = {}
+    while tokens and '=' in tokens[-1]:
+        key, value = tokens.pop().split('=', 1)
+        options[key.lower()] = value
+    spec = ' '.join(tokens)
+    make_spec(spec)
+
+    jitter = int(options.get('jitter', '0'))
+    missed = options.get('missed', 'skip')
+    if jitter < 0 or missed not in MISSED_POLICIES:
+        raise ScheduleError(f"jitter must be >= 0 and missed one of {', '.join(MISSED_POLICIES)}")
+    return spec, {'jitter': jitter, 'missed': missed}
+
+
+def make_spec(spec):
+    if spec.startswith('every '):
+        return IntervalSpec(spec[len('every '):])
+    return CronSpec(spec)
+
+
+# --- Scheduler ---
+
+class Scheduler:
+    """
+    `runner(job)` is called on a fresh thread for every due job and should
+    block until the run finishes; a job never overlaps with itself.
+    """
+
+    def __init__(self, store_path, runner):
+        self.store_path = store_path
+        self.runner = runner
+        self.jobs = {}
+        self.running = set()
+        self._heap = []  # (next_run, job_id); stale entries are skipped lazily
+        self._cond = threading.Condition()
+        self._thread = None
+
+    # Persistence
+
+    def load(self):
+        if not os.path.exists(self.store_path):
+            return
+        with open(self.store_path, 'r') as f:
+            jobs = json.load(f)
+        now = time.time()
+        with self._cond:
+            for job in jobs:
+                try:
+                    spec = make_spec(job['spec'])
+                except ScheduleError:
+                    continue
+                if job['next_run'] < now:
+                    # Missed while the bot was down
+                    job['next_run'] = now if job.get('missed') == 'run' else spec.next_after(now)
+                self.jobs[job['id']] = job
+                heapq.heappush(self._heap, (job['next_run'], job['id']))
+            self._cond.notify()
+
+    def _save(self):
+        directory = os.path.dirname(self.store_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.store_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(list(self.jobs.values()), f, indent=1)
+        os.replace(tmp_path, self.store_path)
+
+    # Public API
+
+    def add(self, file_name, chat_id, user_id, text):
+        spec, options = parse_schedule(text)
+        job = {
+            'id': uuid.uuid4().hex[:8],
+            'file_name': file_name,
+            'chat_id': chat_id,
+            'user_id': user_id,
+            'spec': spec,
+            'jitter': options['jitter'],
+            'missed': options['missed'],
+            'next_run': make_spec(spec).next_after(time.time()),
+            'last_run': None,
+        }
+        with self._cond:
+            self.jobs[job['id']] = job
+            heapq.heappush(self._heap, (job['next_run'], job['id']))
+            self._save()
+            self._cond.notify()
+        return job
+
+    def remove(self, job_id):
+        with self._cond:
+            job = self.jobs.pop(job_id, None)
+            if job is not None:
+                self._save()
+                self._cond.notify()
+            return job
+
+    def remove_file(self, file_name):
+        with self._cond:
+            for job_id in [j['id'] for j in self.jobs.values() if j['file_name'] == file_name]:
+                del self.jobs[job_id]
+            self._save()
+            self._cond.notify()
+
+    def jobs_for(self, user_id=None):
+        with self._cond:
+            return sorted(
+                (dict(j) for j in self.jobs.values() if user_id is None or j['user_id'] == user_id),
+                key=lambda j: j['next_run']
+            )
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    # Timer loop
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                due = []
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    run_at, job_id = heapq.heappop(self._heap)
+                    job = self.jobs.get(job_id)
+                    # Stale entry: job removed or rescheduled since this was pushed
+                    if job is None or job['next_run'] != run_at:
+                        continue
+                    due.append(job)
+                    job['next_run'] = make_spec(job['spec']).next_after(max(now, run_at))
+                    heapq.heappush(self._heap, (job['next_run'], job_id))
+                if due:
+                    self._save()
+                timeout = self._heap[0][0] - now if self._heap else None
+                if not due:
+                    self._cond.wait(timeout)
+
+            for job in due:
+                self._dispatch(job)
+
+    def _dispatch(self, job):
+        if job['id'] in self.running:
+            return  # Previous run still going: skip instead of piling up
+        self.running.add(job['id'])
+
+        def run():
+            try:
+                if job['jitter']:
+                    time.sleep(random.uniform(0, job['jitter']))
+                if job['id'] in self.jobs:
+                    job['last_run'] = time.time()
+                    self.runner(job)
+            finally:
+                self.running.discard(job['id'])
+
+        threading.Thread(target=run, daemon=True).start()
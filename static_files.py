@@ -0,0 +1,349 @@
+"""
+Static file serving for uploads the owner chose to publish (🔗 Publish).
+
+Published files are served by StaticApp, mounted in the dispatcher at
+/files/<user_id>/<file name>, with:
+
+- Range requests (single range, 206/416) and conditional GETs (ETag,
+  If-None-Match, If-Modified-Since, If-Range -> 304)
+- gzip (and brotli, when the optional `brotli` package is installed)
+  variants of cacheable text assets, compressed once into CACHE_DIR and
+  keyed on the file's size and mtime so a re-upload is never served stale;
+  superseded variants are pruned when a new one is written, and all of a
+  file's variants are removed when it is unpublished or deleted
+- FileRange bodies: servers that accept it as `wsgi.file_wrapper`
+  (coldstart.py) send it with os.sendfile, so the bytes never enter Python;
+  elsewhere it is read in large blocks
+"""
+import os
+import glob
+import json
+import gzip
+import shutil
+import hashlib
+import mimetypes
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_PREFIX = "/files"
+CACHE_DIR = os.path.abspath(os.environ.get("STATIC_CACHE_DIR", os.path.join("cache", "static")))
+MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", "300"))
+BLOCK_SIZE = 256 * 1024
+MIN_COMPRESS_BYTES = 1024
+COMPRESSIBLE_TYPES = {
+    "application/javascript", "application/json", "application/xml",
+    "application/x-javascript", "image/svg+xml", "application/wasm",
+}
+
+
+class FileRange:
+    """
+    `length` bytes of an open file starting at `offset` (defaults: the
+    current position to EOF). Usable as a PEP 3333 wsgi.file_wrapper.
+
+    Objects without a real file descriptor (io.BytesIO from send_file...)
+    get length None: they are read block by block to EOF and never sendfile'd.
+    """
+
+    def __init__(self, filelike, block_size=BLOCK_SIZE, offset=None, length=None):
+        self.filelike = filelike
+        self.block_size = block_size
+        try:
+            self.offset = filelike.tell() if offset is None else offset
+            if length is None:
+                length = os.fstat(filelike.fileno()).st_size - self.offset
+        except (AttributeError, OSError):
+            # No descriptor (io.UnsupportedOperation is an OSError) or not seekable
+            self.offset, length = offset, None
+        self.length = length
+        self.on_close = []
+
+    def __iter__(self):
+        if self.length is None:
+            if self.offset is not None:
+                self.filelike.seek(self.offset)
+            read = self.filelike.read
+            for chunk in iter(lambda: read(self.block_size), b""):
+                yield chunk
+            return
+        self.filelike.seek(self.offset)
+        remaining = self.length
+        while remaining > 0:
+            chunk = self.filelike.read(min(self.block_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self.filelike.close()
+        finally:
+            for callback in self.on_close:
+                callback()
+
+
+# --- Publishing ---
+
+class StaticRegistry:
+    """Which uploads are public, and under whose /files/<user_id>/ namespace."""
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self.published = {}  # file name -> user id
+        self._lock = threading.Lock()
+
+    def load(self):
+        if os.path.exists(self.store_path):
+            with open(self.store_path, 'r') as f:
+                self.published = {name: int(uid) for name, uid in json.load(f).items()}
+
+    def _save(self):
+        directory = os.path.dirname(self.store_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.store_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.published, f)
+        os.replace(tmp_path, self.store_path)
+
+    def publish(self, file_name, user_id):
+        with self._lock:
+            self.published[file_name] = user_id
+            self._save()
+        return url_path(user_id, file_name)
+
+    def unpublish(self, file_name):
+        with self._lock:
+            if self.published.pop(file_name, None) is not None:
+                self._save()
+
+    def owner(self, file_name):
+        return self.published.get(file_name)
+
+
+def url_path(user_id, file_name):
+    return f"{STATIC_PREFIX}/{user_id}/{file_name}"
+
+
+# --- Precompression ---
+
+def is_compressible(content_type, size):
+    if size < MIN_COMPRESS_BYTES or content_type is None:
+        return False
+    return content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES
+
+
+def _variant_key(path):
+    return hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16]
+
+
+def _variant_path(path, st, encoding):
+    return os.path.join(CACHE_DIR, f"{_variant_key(path)}-{st.st_mtime_ns:x}-{st.st_size:x}.{encoding}")
+
+
+def remove_variants(path, keep=()):
+    """Deletes the precompressed variants of `path`, except those in `keep`."""
+    for variant in glob.glob(os.path.join(CACHE_DIR, f"{_variant_key(path)}-*")):
+        if variant in keep or variant.endswith('.tmp'):
+            continue  # Current variants, or another thread's write in progress
+        try:
+            os.remove(variant)
+        except OSError:
+            pass
+
+
+def _encodings():
+    return ("br", "gz") if brotli is not None else ("gz",)
+
+
+def precompress(path):
+    """Writes the gzip/brotli variants of `path` if missing; returns the ones that exist."""
+    st = os.stat(path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    done, current = [], set()
+    for encoding in _encodings():
+        target = _variant_path(path, st, encoding)
+        current.add(target)
+        if not os.path.exists(target):
+            tmp = f"{target}.{threading.get_ident()}.tmp"
+            with open(path, 'rb') as src, open(tmp, 'wb') as dst:
+                if encoding == "gz":
+                    with gzip.GzipFile(fileobj=dst, mode='wb', compresslevel=9, mtime=0) as gz:
+                        shutil.copyfileobj(src, gz, BLOCK_SIZE)
+                else:
+                    dst.write(brotli.compress(src.read(), quality=11))
+            os.replace(tmp, target)
+        done.append(encoding)
+    # Variants of earlier versions of the file (other mtime/size)
+    remove_variants(path, keep=current)
+    return done
+
+
+# --- Serving ---
+
+def _etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/"x" matches "x"
+    tags = [t.strip() for t in header.split(",")]
+    return any(t.removeprefix("W/") == etag for t in tags)
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive, None for "serve it all", or "unsatisfiable"."""
+    if not header.startswith("bytes=") or "," in header:
+        return None  # Multiple ranges: a full 200 is a valid answer
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                return "unsatisfiable"
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+
+class StaticApp:
+    def __init__(self, registry, upload_dir, allow_request=None):
+        self.registry = registry
+        self.upload_dir = upload_dir
+        self.allow_request = allow_request  # allow_request(user_id) -> bool (quotas)
+        self._compressing = set()
+        self._lock = threading.Lock()
+
+    def _precompress_later(self, path):
+        with self._lock:
+            if path in self._compressing:
+                return
+            self._compressing.add(path)
+
+        def run():
+            try:
+                precompress(path)
+                if self.registry.owner(os.path.basename(path)) is None:
+                    remove_variants(path)  # Unpublished while compressing
+            except OSError:
+                pass
+            finally:
+                with self._lock:
+                    self._compressing.discard(path)
+        threading.Thread(target=run, daemon=True).start()
+
+    def warm(self, path):
+        """Precompresses a newly published or re-uploaded file in the background."""
+        if is_compressible(mimetypes.guess_type(path)[0], os.path.getsize(path)):
+            self._precompress_later(path)
+
+    def forget(self, file_name):
+        """Drops the cached variants of an unpublished or deleted upload."""
+        remove_variants(os.path.join(self.upload_dir, file_name))
+
+    def _simple(self, start_response, status, body=b"", headers=()):
+        start_response(status, [("Content-Type", "text/plain"), ("Content-Length", str(len(body)))] + list(headers))
+        return [body]
+
+    def _pick_variant(self, environ, path, st, content_type):
+        # Serves an existing precompressed variant, or schedules one and serves identity
+        if not is_compressible(content_type, st.st_size):
+            return path, st, None
+        accepted = environ.get("HTTP_ACCEPT_ENCODING", "")
+        for encoding, token in (("br", "br"), ("gz", "gzip")):
+            if encoding not in _encodings() or token not in accepted:
+                continue
+            variant = _variant_path(path, st, encoding)
+            try:
+                return variant, os.stat(variant), token
+            except FileNotFoundError:
+                self._precompress_later(path)
+                break
+        return path, st, None
+
+    def __call__(self, environ, start_response):
+        method = environ.get("REQUEST_METHOD", "GET")
+        if method not in ("GET", "HEAD"):
+            return self._simple(start_response, "405 Method Not Allowed", b"Method not allowed\n", [("Allow", "GET, HEAD")])
+
+        user_part, _, file_name = environ.get("PATH_INFO", "").lstrip("/").partition("/")
+        # WSGI hands PATH_INFO over as latin-1 decoded bytes; upload names are UTF-8
+        file_name = file_name.encode("latin-1").decode("utf-8", "replace")
+        if not user_part.isdigit() or self.registry.owner(file_name) != int(user_part):
+            return self._simple(start_response, "404 Not Found", b"Not found\n")
+        user_id = int(user_part)
+        if self.allow_request is not None and not self.allow_request(user_id):
+            return self._simple(start_response, "429 Too Many Requests", b"Daily request quota exceeded\n", [("Retry-After", "3600")])
+
+        path = os.path.join(self.upload_dir, file_name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return self._simple(start_response, "404 Not Found", b"Not found\n")
+
+        content_type = mimetypes.guess_type(file_name)[0]
+        serve_path, serve_st, encoding = self._pick_variant(environ, path, st, content_type)
+
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}{"-" + encoding if encoding else ""}"'
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+        headers = [
+            ("ETag", etag),
+            ("Last-Modified", last_modified),
+            ("Cache-Control", f"public, max-age={MAX_AGE}"),
+            ("Accept-Ranges", "bytes"),
+        ]
+        if is_compressible(content_type, st.st_size):
+            headers.append(("Vary", "Accept-Encoding"))
+
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+        if if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, etag)
+        else:
+            not_modified = False
+            since = environ.get("HTTP_IF_MODIFIED_SINCE")
+            if since:
+                try:
+                    not_modified = int(st.st_mtime) <= parsedate_to_datetime(since).timestamp()
+                except (TypeError, ValueError):
+                    pass
+        if not_modified:
+            start_response("304 Not Modified", headers)
+            return []
+
+        size = serve_st.st_size
+        status, start, length = "200 OK", 0, size
+        byte_range = environ.get("HTTP_RANGE")
+        if_range = environ.get("HTTP_IF_RANGE")
+        if byte_range and (not if_range or if_range == etag or if_range == last_modified):
+            parsed = _parse_range(byte_range, size)
+            if parsed == "unsatisfiable":
+                return self._simple(start_response, "416 Range Not Satisfiable", b"", headers + [("Content-Range", f"bytes */{size}")])
+            if parsed is not None:
+                start, end = parsed
+                status, length = "206 Partial Content", end - start + 1
+                headers.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+
+        if content_type and content_type.startswith("text/"):
+            content_type += "; charset=utf-8"
+        headers += [("Content-Type", content_type or "application/octet-stream"), ("Content-Length", str(length))]
+        if encoding:
+            headers.append(("Content-Encoding", encoding))
+        start_response(status, headers)
+        if method == "HEAD":
+            return []
+
+        f = open(serve_path, 'rb')
+        wrapper = environ.get("wsgi.file_wrapper")
+        if wrapper is not None and wrapper is not FileRange and start == 0 and length == size:
+            # Foreign wrappers (gunicorn...) send the whole file with their own sendfile
+            return wrapper(f, BLOCK_SIZE)
+        return FileRange(f, BLOCK_SIZE, start, length)
@@ -0,0 +1,61 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+APP = """from flask import Flask
+import utils
+
+app = Flask(__name__)
+
+@app.route('/')
+def index():
+    return utils.WHO
+"""
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # The bot creates its data directories in the working directory
+    monkeypatch.setenv("VENVS_ENABLED", "0")
+    monkeypatch.setenv("FORKSERVER_ENABLED", "0")
+    module = importlib.import_module("hostingbotrenderv2")
+    monkeypatch.setattr(module, "VENVS_ENABLED", False)
+    return module
+
+
+def make_project(root, name, who):
+    project_dir = root / name
+    project_dir.mkdir()
+    (project_dir / "utils.py").write_text(f"WHO = {who!r}\n")
+    (project_dir / "app.py").write_text(APP)
+    return str(project_dir)
+
+
+def test_projects_sharing_a_helper_name_import_their_own(bot, tmp_path):
+    path_before = list(sys.path)
+    loaded = []
+    for name, who in (("pa", "A"), ("pb", "B")):
+        project_dir = make_project(tmp_path, name, who)
+        loaded.append(bot.load_api_module(os.path.join(project_dir, "app.py"), 1, project_dir=project_dir))
+
+    responses = [module.app.test_client().get("/").get_data(as_text=True) for _, module in loaded]
+    assert responses == ["A", "B"]
+    assert sys.path == path_before
+    assert "utils" not in sys.modules
+    for module_name, _ in loaded:
+        sys.modules.pop(module_name, None)
+
+
+def test_stashed_module_is_restored(bot, tmp_path, monkeypatch):
+    outside = object()
+    monkeypatch.setitem(sys.modules, "utils", outside)
+    project_dir = make_project(tmp_path, "pc", "C")
+    module_name, module = bot.load_api_module(os.path.join(project_dir, "app.py"), 1, project_dir=project_dir)
+
+    assert module.app.test_client().get("/").get_data(as_text=True) == "C"
+    assert sys.modules["utils"] is outside
+    sys.modules.pop(module_name, None)
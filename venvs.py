@@ -0,0 +1,137 @@
+"""
+Per-project virtual environments backed by a shared local wheelhouse.
+
+Every project gets its own venv, and every user one for their loose .py
+uploads (no system site-packages), so a user's 📦 Install can never upgrade a
+library under the bot or under another user's script or API. Envs are created without pip: the bot's own pip drives them through
+`pip --python <env python>`, which keeps creation to a fraction of a second.
+
+Installs go through WHEELHOUSE_DIR: `pip wheel` only downloads/builds what is
+missing from it, collecting the wheels of one install in a staging directory,
+and the env install runs with `--no-index` on exactly those wheel files (so
+local paths, VCS and URL requirements install too). The wheels then join the
+wheelhouse, so the same package for the 50th user is served from local disk.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import sysconfig
+import threading
+import subprocess
+
+VENV_DIR = os.environ.get("VENV_DIR", "envs")
+WHEELHOUSE_DIR = os.environ.get("WHEELHOUSE_DIR", os.path.join("cache", "wheels"))
+SHARED_ENV = "shared"
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class VenvError(Exception):
+    pass
+
+
+def env_name(project=None, user_id=None):
+    # Every project gets its own env, loose .py uploads one per owner
+    if project:
+        return f"p_{project}"
+    return f"u_{user_id}" if user_id is not None else SHARED_ENV
+
+
+def env_path(name):
+    return os.path.abspath(os.path.join(VENV_DIR, name))
+
+
+def env_python(name):
+    bin_dir = "Scripts" if os.name == "nt" else "bin"
+    exe = "python.exe" if os.name == "nt" else "python"
+    return os.path.join(env_path(name), bin_dir, exe)
+
+
+def env_site_packages(name):
+    return sysconfig.get_path("purelib", vars={"base": env_path(name), "platbase": env_path(name)})
+
+
+def _lock_for(name):
+    with _locks_guard:
+        return _locks.setdefault(name, threading.RLock())
+
+
+def ensure_env(name):
+    """Creates the env on first use and returns its interpreter path."""
+    python = env_python(name)
+    if os.path.exists(python):
+        return python
+    with _lock_for(name):
+        if not os.path.exists(python):
+            import venv  # Only needed the first time an env is created
+            builder = venv.EnvBuilder(system_site_packages=False, symlinks=(os.name != "nt"), with_pip=False)
+            builder.create(env_path(name))
+    return python
+
+
+def remove_env(name):
+    with _lock_for(name):
+        shutil.rmtree(env_path(name), ignore_errors=True)
+
+
+def _pip(args):
+    result = subprocess.run(
+        [sys.executable, "-m", "pip"] + args,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if result.returncode != 0:
+        raise VenvError(result.stderr.strip()[-1000:] or f"pip {' '.join(args[:2])} failed")
+    return result.stdout
+
+
+def staging_dir():
+    """A fresh directory inside the wheelhouse for the wheels of one install."""
+    os.makedirs(WHEELHOUSE_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix=".staging-", dir=WHEELHOUSE_DIR)
+
+
+def keep_wheels(wheel_dir):
+    # Wheels fetched or built for one install join the shared wheelhouse
+    for f in os.listdir(wheel_dir):
+        if f.endswith(".whl"):
+            os.replace(os.path.join(wheel_dir, f), os.path.join(WHEELHOUSE_DIR, f))
+    shutil.rmtree(wheel_dir, ignore_errors=True)
+
+
+def pip_install_args(name, wheel_dir):
+    """Arguments for installing the wheels in `wheel_dir` into env `name` (without the pip prefix)."""
+    wheels = sorted(os.path.join(wheel_dir, f) for f in os.listdir(wheel_dir) if f.endswith(".whl"))
+    return ["--python", ensure_env(name), "install", "--no-index"] + wheels
+
+
+def wheel_args(wheel_dir, requirements=(), requirements_file=None):
+    # Reuses wheels already in the wheelhouse, fetches/builds only the rest
+    args = ["wheel", "--wheel-dir", wheel_dir, "--find-links", WHEELHOUSE_DIR]
+    if requirements_file:
+        args += ["-r", requirements_file]
+    return args + list(requirements)
+
+
+def install(name, requirements=(), requirements_file=None):
+    """Installs packages into env `name` through the shared wheelhouse."""
+    wheel_dir = staging_dir()
+    try:
+        output = _pip(wheel_args(wheel_dir, requirements, requirements_file))
+        with _lock_for(name):
+            output += _pip(pip_install_args(name, wheel_dir))
+    finally:
+        keep_wheels(wheel_dir)
+    return output
+
+
+def install_steps(name, requirements=(), requirements_file=None):
+    """install() as (argv factory, lock) steps plus a cleanup for pip_progress.PipRun."""
+    pip = [sys.executable, "-m", "pip"]
+    wheel_dir = staging_dir()
+    steps = [
+        (lambda: pip + wheel_args(wheel_dir, requirements, requirements_file), None),
+        (lambda: pip + pip_install_args(name, wheel_dir), _lock_for(name)),
+    ]
+    return steps, lambda: keep_wheels(wheel_dir)